@@ -0,0 +1,158 @@
+import re
+
+from agents.text_utils import stitch_chunks
+
+# "[Chapter 1: ... | 1.2 ... | 1.2.1 ...] (Page 7)" prefix added to each page by TextbookProcessor.chunk_text
+HEADING_PREFIX_PATTERN = re.compile(r'^(\[[^\]\n]*\])[ \t]*(?=\(Page \d+\))')
+
+# Rough characters-per-token ratio for English text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def _position(metadata):
+    """Returns (page_number, chunk_index) when both are usable integers, else None."""
+    try:
+        return int(metadata["page_number"]), int(metadata["chunk_index"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _stitch_runs(documents, metadatas, shards, min_overlap):
+    """Group chunks into runs of consecutive chunk_index on one page and stitch each run."""
+    positioned = {}
+    unpositioned = []
+    for document, metadata, shard in zip(documents, metadatas, shards):
+        metadata = metadata or {}
+        position = _position(metadata)
+        if position is None:
+            unpositioned.append({"text": document, "shard": shard, "page_number": metadata.get("page_number"),
+                                 "chunk_indexes": [], "metadata": metadata})
+            continue
+        # The same chunk can come back twice (e.g. from overlapping shards); keep one copy
+        positioned.setdefault((shard, position), (document, metadata))
+
+    runs = []
+    run = []
+    for (shard, (page, index)), (document, metadata) in sorted(
+            positioned.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        if run and not (run[-1][0] == shard and run[-1][1] == page and run[-1][2] == index - 1):
+            runs.append(run)
+            run = []
+        run.append((shard, page, index, document, metadata))
+    if run:
+        runs.append(run)
+
+    return [{
+        "text": stitch_chunks([chunk[3] for chunk in run], min_overlap=min_overlap),
+        "shard": run[0][0],
+        "page_number": run[0][1],
+        "chunk_indexes": [chunk[2] for chunk in run],
+        "metadata": run[0][4]
+    } for run in runs] + unpositioned
+
+
+def _order_passages(passages, shard_order):
+    """Order passages by shard (best hit first), then page; unpositioned ones last."""
+    def key(passage):
+        try:
+            page = int(passage["page_number"])
+        except (TypeError, ValueError):
+            return (shard_order[passage["shard"]], 1, 0, 0)
+        first_index = passage["chunk_indexes"][0] if passage["chunk_indexes"] else -1
+        return (shard_order[passage["shard"]], 0, page, first_index)
+    return sorted(passages, key=key)
+
+
+def _dedupe_headings(passages):
+    """Drop a heading prefix identical to the previous passage's, keeping its "(Page N)" marker."""
+    previous_heading = None
+    for passage in passages:
+        match = HEADING_PREFIX_PATTERN.match(passage["text"])
+        if not match:
+            continue
+        heading = (passage["shard"], match.group(1))
+        if heading == previous_heading:
+            passage["text"] = passage["text"][match.end():]
+        previous_heading = heading
+    return passages
+
+
+def merge_adjacent_chunks(documents, metadatas, shards=None, min_overlap=20):
+    """
+    Stitch retrieved chunks that are neighbours on the same page into passages.
+
+    Hits are grouped by shard and page; runs of consecutive chunk_index values
+    become one passage with the splitter's overlap written once. Passages are
+    ordered by page (shards by their best hit), and a heading prefix identical
+    to the previous passage's is dropped, keeping only its "(Page N)" marker.
+    Chunks without page or chunk_index metadata are kept as they are, after the
+    positioned passages.
+
+    Args:
+        documents (list): Chunk texts in rank order.
+        metadatas (list): Chunk metadata in rank order.
+        shards (list): Shard name of each chunk (None for a single collection).
+        min_overlap (int): Shortest overlap treated as splitter overlap.
+
+    Returns:
+        list: Passages as dicts with "text", "shard", "page_number", "chunk_indexes"
+            and "metadata" (of the passage's first chunk).
+    """
+    return assemble_context(documents, metadatas, shards, min_overlap=min_overlap)
+
+
+def assemble_context(documents, metadatas, shards=None, parents=None, max_tokens=None, min_overlap=20):
+    """
+    Build prompt passages from ranked hits, expanding children to parent windows.
+
+    Hits are visited best first. A hit with a parent window (small-to-big
+    retrieval) contributes the whole parent, once, if it still fits the token
+    budget; otherwise the hit's own chunk is used if that fits. The selected
+    chunks are then stitched with merge_adjacent_chunks' rules, and all passages
+    are ordered by page.
+
+    Args:
+        documents (list): Chunk texts in rank order.
+        metadatas (list): Chunk metadata in rank order.
+        shards (list): Shard name of each chunk (None for a single collection).
+        parents (list): Parent of each chunk as returned by ParentStore.lookup, or None.
+        max_tokens (int): Context budget in estimated tokens (None for no limit).
+        min_overlap (int): Shortest overlap treated as splitter overlap.
+
+    Returns:
+        list: Passages as dicts with "text", "shard", "page_number", "chunk_indexes",
+            "metadata" and, for parent windows, "parent_id".
+    """
+    shards = shards or [None] * len(documents)
+    parents = parents or [None] * len(documents)
+    budget = max_tokens * CHARS_PER_TOKEN if max_tokens else float("inf")
+
+    shard_order = {}
+    used = 0
+    parent_passages = {}
+    child_hits = []
+    for document, metadata, shard, parent in zip(documents, metadatas, shards, parents):
+        shard_order.setdefault(shard, len(shard_order))
+        if parent is not None:
+            key = (shard, parent["parent_id"])
+            if key in parent_passages:
+                continue
+            if used + len(parent["text"]) <= budget:
+                used += len(parent["text"])
+                parent_passages[key] = {
+                    "text": parent["text"],
+                    "shard": shard,
+                    "page_number": parent["metadata"].get("page_number"),
+                    "chunk_indexes": [],
+                    "metadata": parent["metadata"],
+                    "parent_id": parent["parent_id"]
+                }
+                continue
+        if used + len(document) <= budget:
+            used += len(document)
+            child_hits.append((document, metadata, shard))
+
+    passages = list(parent_passages.values())
+    if child_hits:
+        passages += _stitch_runs(*zip(*child_hits), min_overlap=min_overlap)
+    return _dedupe_headings(_order_passages(passages, shard_order))
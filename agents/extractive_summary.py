@@ -0,0 +1,80 @@
+import numpy as np
+
+from agents.text_utils import split_sentences
+
+
+def textrank_scores(embeddings, damping=0.85, iterations=50, tolerance=1e-6):
+    """
+    Score sentences by centrality with TextRank over a cosine-similarity graph.
+
+    Args:
+        embeddings (np.ndarray): One embedding per sentence, shape (n, dim).
+        damping (float): PageRank damping factor.
+        iterations (int): Maximum number of power iterations.
+        tolerance (float): Stop once scores change less than this.
+
+    Returns:
+        np.ndarray: One score per sentence; higher means more central.
+    """
+    n = embeddings.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    normalized = embeddings / np.maximum(norms, 1e-12)
+    similarity = normalized @ normalized.T
+    np.fill_diagonal(similarity, 0.0)
+    np.clip(similarity, 0.0, None, out=similarity)
+
+    # Row-normalize into a transition matrix; isolated sentences link to everyone
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    transition = np.where(row_sums > 0, similarity / np.maximum(row_sums, 1e-12), 1.0 / n)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float64)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tolerance:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+
+def extract_salient_sentences(text, embedding_function, max_chars=None, max_sentences=None):
+    """
+    Select the most central sentences of a text, kept in their original order.
+
+    Args:
+        text (str): The text to condense.
+        embedding_function (callable): Maps a list of strings to a list of embeddings
+            (e.g. SentenceTransformerEmbeddingFunction).
+        max_chars (int): Character budget for the selected sentences.
+        max_sentences (int): Maximum number of sentences to select.
+
+    Returns:
+        dict: The extracted text plus sentence counts.
+    """
+    sentences = [body for body, _ in split_sentences(text) if body.strip()]
+    if not sentences:
+        return {"text": "", "sentences_total": 0, "sentences_selected": 0}
+
+    embeddings = np.asarray(embedding_function(sentences), dtype=np.float32)
+    scores = textrank_scores(embeddings)
+
+    selected = []
+    used_chars = 0
+    for i in np.argsort(-scores):
+        if max_sentences is not None and len(selected) >= max_sentences:
+            break
+        length = len(sentences[i]) + 1
+        if max_chars is not None and selected and used_chars + length > max_chars:
+            continue
+        selected.append(int(i))
+        used_chars += length
+
+    selected.sort()
+    return {
+        "text": " ".join(sentences[i] for i in selected),
+        "sentences_total": len(sentences),
+        "sentences_selected": len(selected)
+    }
@@ -2,11 +2,18 @@ import os
 from dotenv import load_dotenv
 import google.generativeai as genai
 from sentence_transformers import SentenceTransformer
-import requests
-from bs4 import BeautifulSoup
 import time
+import threading
 import re
 from urllib.parse import urlparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.metrics import stage_timer, record_error, generate_content
+from agents.context_assembly import assemble_context
+from agents.passage_selection import split_passages, select_passages
+from agents.html_extraction import extract_wikipedia, extract_page_text, default_backend
+from agents.http_client import HTTPClient, UnsupportedContentError
 
 # Load environment variables
 load_dotenv()
@@ -23,23 +30,67 @@ class SentenceTransformerEmbeddingFunction:
 
 
 class HistoryQuestionAnswerer:
-    def __init__(self, client, collection_name, model_name="gemini-1.5-flash"):
+    def __init__(self, client, collection_name, model_name="gemini-1.5-flash", embedding_function=None,
+                 vector_index=None, router=None, max_shard_workers=8, merge_chunks=True,
+                 parent_store=None, context_token_budget=None, web_passage_chars=1500,
+                 rerank_web_passages=True, page_cache_size=128, html_backend=None,
+                 wikipedia_max_paragraphs=60, http_client=None):
         """
         Initialize with existing ChromaDB client and collection name.
 
         Args:
             client (chromadb.PersistentClient): Shared ChromaDB client instance.
-            collection_name (str): Name of the ChromaDB collection.
+            collection_name (str or list): Name of the ChromaDB collection, or a list of
+                collections (e.g. one per book or subject) searched as shards. All shards
+                must use the same embedding model and distance space.
             model_name (str): Gemini model name.
+            embedding_function (callable): Embedding function for queries; defaults to
+                SentenceTransformerEmbeddingFunction.
+            vector_index (NumpyVectorIndex or QuantizedVectorIndex): Optional index
+                answering queries instead of the first Chroma collection.
+            router (CentroidShardRouter): Optional router choosing which shards to search.
+            max_shard_workers (int): Maximum number of shards queried concurrently.
+            merge_chunks (bool): Stitch neighbouring retrieved chunks into passages
+                without their repeated overlap (see context_assembly); always done when
+                parent windows or a token budget apply.
+            parent_store (ParentStore): Parent windows of small-to-big collections; matched
+                child chunks are replaced by their deduplicated parent window.
+            context_token_budget (int): Estimated tokens of database context per question
+                (None for no limit).
+            web_passage_chars (int): Characters of query-relevant passages kept per scraped page.
+            rerank_web_passages (bool): Re-score the best lexical passage matches with the
+                embedding model.
+            page_cache_size (int): Number of parsed pages kept in the URL cache.
+            html_backend (str): "lxml" or "bs4" page extraction (see html_extraction);
+                defaults to lxml when it is installed.
+            wikipedia_max_paragraphs (int): Body paragraphs read from a Wikipedia article
+                before parsing stops (None for the whole article).
+            http_client (HTTPClient): Pooled client used for scraping; defaults to one
+                sending the agent's User-Agent.
         """
         self.client = client
 
-        self.embedding_function = SentenceTransformerEmbeddingFunction()
+        self.embedding_function = embedding_function or SentenceTransformerEmbeddingFunction()
 
-        self.collection = self.client.get_collection(
-            name=collection_name,
-            embedding_function=self.embedding_function
-        )
+        collection_names = [collection_name] if isinstance(collection_name, str) else list(collection_name)
+        self.collections = {
+            name: self.client.get_collection(name=name, embedding_function=self.embedding_function)
+            for name in collection_names
+        }
+        self.collection = self.collections[collection_names[0]]
+        # Per-shard indexes answering queries instead of the Chroma collection
+        self.vector_indexes = {}
+        self.vector_index = vector_index
+        self.router = router
+        self.max_shard_workers = max_shard_workers
+        self.merge_chunks = merge_chunks
+        self.parent_store = parent_store
+        self.context_token_budget = context_token_budget
+        self.web_passage_chars = web_passage_chars
+        self.rerank_web_passages = rerank_web_passages
+        self.page_cache_size = page_cache_size
+        self.html_backend = html_backend or default_backend()
+        self.wikipedia_max_paragraphs = wikipedia_max_paragraphs
 
         google_api_key = os.getenv("GOOGLE_API_KEY")
         if not google_api_key:
@@ -52,36 +103,150 @@ class HistoryQuestionAnswerer:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         }
+        # Keep-alive connection pool shared by all scrapes
+        self.http_client = http_client or HTTPClient(headers=self.headers)
         
-        # URL cache to avoid repeated scraping of the same URLs
-        self.url_content_cache = {}
+        # Parsed pages by URL (least recently used first) to avoid repeated scraping
+        self.url_content_cache = OrderedDict()
+        # gthread workers scrape from several request threads at once
+        self._page_cache_lock = threading.Lock()
+
+    @property
+    def vector_index(self):
+        """The index of the first (or only) collection, if any."""
+        return self.vector_indexes.get(self.collection.name)
+
+    @vector_index.setter
+    def vector_index(self, index):
+        if index is None:
+            self.vector_indexes.pop(self.collection.name, None)
+        else:
+            self.vector_indexes[self.collection.name] = index
 
-    def retrieve_context(self, query, n_results=10):
-        """Retrieve relevant context from the ChromaDB collection"""
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
+    def reset_client(self, client):
+        """
+        Switch to a new ChromaDB client, e.g. one created in a freshly forked worker.
 
-        contexts = results.get("documents", [[]])[0]
-        metadatas = results.get("metadatas", [[]])[0]
+        Args:
+            client (chromadb.PersistentClient): The new client.
+        """
+        self.client = client
+        self.collections = {
+            name: self.client.get_collection(name=name, embedding_function=self.embedding_function)
+            for name in self.collections
+        }
+        self.collection = self.collections[self.collection.name]
+        # A quantized index reads documents and metadatas through the collection
+        for name, index in self.vector_indexes.items():
+            if getattr(index, "collection", None) is not None:
+                index.collection = self.collections[name]
 
-        context_text = "\n\n".join(contexts)
+    def select_shards(self, query_embedding, shards=None):
+        """
+        Choose the collections to search.
+
+        Args:
+            query_embedding (list): The query's embedding, used by the router.
+            shards (list): Explicit shard names, overriding the router.
+
+        Returns:
+            list: Shard names.
+        """
+        if shards:
+            unknown = [name for name in shards if name not in self.collections]
+            if unknown:
+                raise ValueError(f"Unknown shards: {', '.join(unknown)}")
+            return list(shards)
+        if self.router is not None and len(self.collections) > 1:
+            return self.router.route(query_embedding)
+        return list(self.collections)
+
+    def _query_shard(self, name, query_embeddings, n_results, where=None):
+        index = self.vector_indexes.get(name)
+        searcher = index or self.collections[name]
+        with stage_timer("history", "vector_index_query" if index else "chroma_query"):
+            return searcher.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where
+            )
+
+    def retrieve_context(self, query, n_results=10, shards=None, where=None):
+        """
+        Retrieve relevant context from the ChromaDB collections.
+
+        With several shards, each selected shard is queried concurrently for its own
+        top n_results and the hits are merged by distance.
+
+        Args:
+            query (str): The question.
+            n_results (int): Number of chunks returned.
+            shards (list): Shard names to search instead of the router's choice.
+            where (dict): Metadata filter (see retrieval_filters.build_where) pushed
+                down to Chroma or the local index, e.g. to search a single chapter.
+        """
+        # Embed explicitly so embedding and vector search are timed separately
+        with stage_timer("history", "embedding"):
+            query_embeddings = self.embedding_function([query])
+        searched = self.select_shards(query_embeddings[0], shards)
+
+        if len(searched) == 1:
+            shard_results = [self._query_shard(searched[0], query_embeddings, n_results, where)]
+        else:
+            with stage_timer("history", "shard_fanout"):
+                with ThreadPoolExecutor(max_workers=min(self.max_shard_workers, len(searched))) as executor:
+                    shard_results = list(executor.map(
+                        lambda name: self._query_shard(name, query_embeddings, n_results, where), searched
+                    ))
+
+        hits = []
+        for name, results in zip(searched, shard_results):
+            documents = results.get("documents", [[]])[0]
+            metadatas = results.get("metadatas", [[]])[0]
+            distances = results.get("distances", [[]])[0]
+            ids = results.get("ids", [[]])[0]
+            hits.extend(zip(distances, documents, metadatas, [name] * len(documents), ids))
+        if len(searched) > 1:
+            hits = sorted(hits, key=lambda hit: hit[0])[:n_results]
+
+        parents = None
+        if self.parent_store is not None and hits:
+            with stage_timer("history", "parent_lookup"):
+                found = {}
+                for name in dict.fromkeys(hit[3] for hit in hits):
+                    shard_parents = self.parent_store.lookup(name, [hit[4] for hit in hits if hit[3] == name])
+                    found.update({(name, chunk_id): parent for chunk_id, parent in shard_parents.items()})
+            parents = [found.get((hit[3], hit[4])) for hit in hits]
+
+        if self.merge_chunks or parents or self.context_token_budget:
+            passages = assemble_context(
+                [hit[1] for hit in hits], [hit[2] for hit in hits], [hit[3] for hit in hits],
+                parents=parents, max_tokens=self.context_token_budget
+            )
+            context_text = "\n\n".join(passage["text"] for passage in passages)
+        else:
+            context_text = "\n\n".join(hit[1] for hit in hits)
 
         sections = []
         pages = []
-        for meta in metadatas:
+        contributing = []
+        for _, _, meta, name, _ in hits:
+            meta = meta or {}
             section = meta.get("section")
             page = meta.get("page_number")
             if section and section not in sections:
                 sections.append(section)
             if page and page not in pages:
                 pages.append(page)
+            if name not in contributing:
+                contributing.append(name)
 
         return {
             "context": context_text,
             "sections": sections,
-            "pages": pages
+            "pages": pages,
+            "shards": contributing,
+            "searched_shards": searched
         }
     
     def extract_urls_from_text(self, text):
@@ -96,165 +261,154 @@ class HistoryQuestionAnswerer:
             cleaned_urls.append(url)
         return cleaned_urls
         
+    def _load_page(self, url, parse):
+        """
+        Download and parse a page, caching the parsed page per URL.
+
+        The cache holds query-independent page text, so different questions
+        about the same page reuse one download and parse.
+
+        Args:
+            url (str): URL to fetch.
+            parse (callable): Turns the page HTML into a dict of extracted text.
+
+        Returns:
+            dict: The parsed page.
+        """
+        with self._page_cache_lock:
+            page = self.url_content_cache.get(url)
+            if page is not None:
+                self.url_content_cache.move_to_end(url)
+                return page
+
+        # Fetch and parse outside the lock so other pages are not held up
+        page = parse(self.http_client.fetch_text(url))
+
+        with self._page_cache_lock:
+            self.url_content_cache[url] = page
+            while len(self.url_content_cache) > self.page_cache_size:
+                self.url_content_cache.popitem(last=False)
+        return page
+
+    def _parse_wikipedia_page(self, html):
+        """Extract the title, infobox and leading body paragraphs of a Wikipedia article."""
+        return extract_wikipedia(html, self.html_backend, self.wikipedia_max_paragraphs)
+
+    def _parse_generic_page(self, html):
+        """Extract the main text of an arbitrary web page."""
+        return extract_page_text(html, self.html_backend)
+
+    def _select_passages(self, text, query):
+        """The passages of a page's text most relevant to the query, within the per-source budget."""
+        with stage_timer("history", "passage_selection"):
+            selected = select_passages(
+                split_passages(text),
+                query,
+                max_chars=self.web_passage_chars,
+                embedding_function=self.embedding_function if self.rerank_web_passages else None
+            )
+        return [passage for _, passage in selected]
+
     def get_wikipedia_info(self, url, query):
         """Specialized extraction for Wikipedia articles"""
         try:
-            response = requests.get(url, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract the article title
-            title = soup.find('h1', {'id': 'firstHeading'}).text if soup.find('h1', {'id': 'firstHeading'}) else "Unknown Title"
-            
-            # Find the infobox (right sidebar with key facts)
-            infobox = soup.find('table', {'class': 'infobox'})
-            infobox_data = ""
-            
-            if infobox:
-                # Extract key-value pairs from infobox
-                rows = infobox.find_all('tr')
-                for row in rows:
-                    header = row.find('th')
-                    value = row.find('td')
-                    if header and value:
-                        header_text = header.get_text(strip=True)
-                        value_text = value.get_text(strip=True)
-                        infobox_data += f"{header_text}: {value_text}\n"
-            
-            # Find main content
-            content_div = soup.find('div', {'id': 'mw-content-text'})
-            
-            # Extract first few paragraphs (usually biographical info)
-            paragraphs = content_div.find_all('p', recursive=False)[:5] if content_div else []
-            intro_text = "\n".join([p.get_text(strip=True) for p in paragraphs])
-            
+            page = self._load_page(url, self._parse_wikipedia_page)
+            sections = page["sections"]
+
             # For biographical articles, specifically look for birth information
             birth_info = ""
-            
+
             # Look for date of birth in the first few paragraphs
+            intro_text = "\n".join(sections[0][1][:5])
             birth_date_pattern = r'born (\w+ \d+,? \d{4})'
             birth_matches = re.search(birth_date_pattern, intro_text)
             if birth_matches:
                 birth_info += f"Birth date: {birth_matches.group(1)}\n"
-                
+
             # Look for specific sections that might contain biographical info
             if 'birth' in query.lower() or 'born' in query.lower():
-                for heading in soup.find_all(['h2', 'h3']):
-                    heading_text = heading.get_text().lower()
+                for heading, paragraphs in sections[1:]:
+                    heading_text = heading.lower()
                     if 'early' in heading_text or 'life' in heading_text or 'birth' in heading_text or 'personal' in heading_text:
-                        section = []
-                        for sibling in heading.find_next_siblings():
-                            if sibling.name and sibling.name.startswith('h'):
-                                break
-                            if sibling.name == 'p':
-                                section.append(sibling.get_text(strip=True))
-                        
-                        section_text = "\n".join(section)
+                        section_text = "\n".join(paragraphs)
                         if section_text:
-                            birth_info += f"From '{heading.get_text(strip=True)}' section:\n{section_text[:500]}...\n\n"
-                        
+                            birth_info += f"From '{heading}' section:\n{section_text[:500]}...\n\n"
+
                         # Look for specific dates in this section
                         date_pattern = r'\b\d{1,2}\s+\w+\s+\d{4}\b|\b\w+\s+\d{1,2},?\s+\d{4}\b'
                         dates = re.findall(date_pattern, section_text)
                         if dates:
                             birth_info += f"Dates mentioned: {', '.join(dates)}\n"
-            
+
+            # Passages from anywhere in the article, not just the lead, chosen for this question
+            article_text = "\n\n".join(paragraph for _, paragraphs in sections for paragraph in paragraphs)
+            passages = self._select_passages(article_text, query)
+
             # Combine all extracted information
-            wiki_content = f"WIKIPEDIA ARTICLE: {title}\n\n"
-            
-            if infobox_data:
-                wiki_content += f"KEY FACTS:\n{infobox_data}\n\n"
-                
+            wiki_content = f"WIKIPEDIA ARTICLE: {page['title']}\n\n"
+
+            if page["infobox"]:
+                wiki_content += f"KEY FACTS:\n{page['infobox']}\n\n"
+
             if birth_info:
                 wiki_content += f"BIRTH INFORMATION:\n{birth_info}\n\n"
-            
-            wiki_content += f"INTRODUCTION:\n{intro_text[:1000]}...\n"
-            
+
+            if passages:
+                wiki_content += "RELEVANT PASSAGES:\n" + "\n...\n".join(passages) + "\n"
+
             return wiki_content
-            
+
         except Exception as e:
             print(f"Error processing Wikipedia page {url}: {str(e)}")
+            record_error("history", "scrape")
             return f"Error accessing Wikipedia: {str(e)}"
-    
+
     def scrape_web_content(self, url, query):
         """
         Scrape content from a single URL with enhanced extraction
-        
+
         Args:
             url (str): URL to scrape
             query (str): The user's query to guide extraction
-            
+
         Returns:
-            str: Extracted text content
+            str: The passages of the page most relevant to the query, or None when the
+                page is skipped (social media or non-HTML content)
         """
-        # Check cache first
-        cache_key = f"{url}_{query}"
-        if cache_key in self.url_content_cache:
-            return self.url_content_cache[cache_key]
-            
         try:
             # Parse URL to determine appropriate handling
             parsed_url = urlparse(url)
             domain = parsed_url.netloc.lower()
-            
+
             # Skip certain domains that might block scraping
             if any(blocked in domain for blocked in ['instagram.com', 'facebook.com']):
-                return f"Content from {url} unavailable (social media content)"
-            
+                return None
+
             # Special handling for Wikipedia
             if 'wikipedia.org' in domain:
-                content = self.get_wikipedia_info(url, query)
-                self.url_content_cache[cache_key] = content
-                return content
-                
+                return self.get_wikipedia_info(url, query)
+
             # Default handling for other sites
-            response = requests.get(url, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            
-            # Parse HTML content
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove non-content elements
-            for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-                element.decompose()
-                
-            # Try to find main content
-            main_content = None
-            for selector in ['article', 'main', '.main-content', '#content', '.content']:
-                main_content = soup.select_one(selector)
-                if main_content:
-                    break
-            
-            # If main content found, use it; otherwise use the whole body
-            if main_content:
-                text = main_content.get_text(separator=' ', strip=True)
-            else:
-                text = soup.get_text(separator=' ', strip=True)
-                
-            # Clean up text
-            clean_text = re.sub(r'\s+', ' ', text).strip()
-            
-            # Look for specific information based on query
-            query_terms = query.lower().split()
-            
+            clean_text = self._load_page(url, self._parse_generic_page)["text"]
+
             # For birthday/birth date queries
+            dates_found = ""
             if any(term in query.lower() for term in ['birth', 'born', 'birthday']):
                 # Look for dates in the text
                 date_pattern = r'\b\d{1,2}\s+\w+\s+\d{4}\b|\b\w+\s+\d{1,2},?\s+\d{4}\b'
                 dates = re.findall(date_pattern, clean_text)
                 if dates:
-                    clean_text = f"Dates found in the text: {', '.join(dates[:5])}\n\n" + clean_text
-            
-            # Truncate to reasonable size
-            content = f"Source: {url}\n{clean_text[:3000]}... (content truncated)\n"
-                
-            # Cache the result
-            self.url_content_cache[cache_key] = content
-            return content
-            
+                    dates_found = f"Dates found in the text: {', '.join(dates[:5])}\n\n"
+
+            passages = self._select_passages(clean_text, query)
+            return f"Source: {url}\n{dates_found}" + "\n...\n".join(passages) + "\n"
+
+        except UnsupportedContentError:
+            return None
         except Exception as e:
             error_message = f"Error scraping {url}: {str(e)}"
             print(error_message)
+            record_error("history", "scrape")
             return error_message
     
     def find_relevant_urls(self, query):
@@ -356,26 +510,30 @@ https://www.bbc.co.uk/teach/articles/zbrx8xs
         # Limit number of URLs to process
         return relevant_urls[:5]
 
-    def answer_question(self, query):
+    def answer_question(self, query, shards=None, where=None):
         """
         Answer a history question using both database context and web content
         
         Args:
             query (str): User's history question
+            shards (list): Optional collection names to search instead of the router's choice
+            where (dict): Optional metadata filter scoping the database context
             
         Returns:
             dict: Answer and metadata
         """
         # Get context from database
-        context_info = self.retrieve_context(query)
+        context_info = self.retrieve_context(query, shards=shards, where=where)
         
         # Find relevant URLs for the query
-        relevant_urls = self.find_relevant_urls(query)
+        with stage_timer("history", "url_selection"):
+            relevant_urls = self.find_relevant_urls(query)
         
         # Scrape content from each URL
         web_contents = []
         for url in relevant_urls:
-            content = self.scrape_web_content(url, query)
+            with stage_timer("history", "scrape"):
+                content = self.scrape_web_content(url, query)
             if content and not content.startswith("Error"):
                 web_contents.append(content)
             # Be a good citizen
@@ -445,13 +603,13 @@ Question: {query}
 
         try:
             # Generate answer with context and web content
-            response = self.model.generate_content(prompt)
+            response = generate_content("history", self.model, prompt)
             answer = response.text.strip()
         except Exception as e:
             print(f"Error generating content: {str(e)}")
             # If prompt is too long, create a shortened version
             shortened_prompt = self._create_shortened_prompt(query, context_info["context"], combined_web_content)
-            response = self.model.generate_content(shortened_prompt)
+            response = generate_content("history", self.model, shortened_prompt)
             answer = response.text.strip()
 
         return {
@@ -459,6 +617,7 @@ Question: {query}
             "context": context_info["context"],
             "sections": context_info["sections"],
             "pages": context_info["pages"],
+            "shards": context_info["shards"],
             "web_sources": relevant_urls
         }
     
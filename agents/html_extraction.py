@@ -0,0 +1,239 @@
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # the BeautifulSoup backend works without lxml
+    etree = None
+    lxml_html = None
+
+HTML_BACKENDS = ("lxml", "bs4")
+
+# HTML is fed to the incremental parser in pieces of this many characters,
+# so parsing stops shortly after the last element we need
+FEED_CHARS = 16 * 1024
+
+NON_CONTENT_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside']
+MAIN_CONTENT_SELECTORS = ['article', 'main', '.main-content', '#content', '.content']
+_MAIN_CONTENT_XPATHS = [
+    '//article',
+    '//main',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " main-content ")]',
+    '//*[@id="content"]',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " content ")]',
+]
+
+
+def default_backend():
+    """The fastest available backend: lxml if installed, else BeautifulSoup."""
+    return "lxml" if etree is not None else "bs4"
+
+
+def _collapse(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def extract_wikipedia(html, backend=None, max_paragraphs=None):
+    """
+    Extract the title, infobox and body paragraphs of a Wikipedia article.
+
+    Args:
+        html (str): The article HTML.
+        backend (str): "lxml" (incremental C parser that stops once max_paragraphs
+            body paragraphs are read) or "bs4" (BeautifulSoup with html.parser);
+            None picks default_backend().
+        max_paragraphs (int): Number of body paragraphs to extract (None for all).
+
+    Returns:
+        dict: "title", "infobox" ("Label: value" lines) and "sections", a list of
+            (heading, paragraphs) pairs starting with the lead section ("" heading).
+    """
+    backend = backend or default_backend()
+    if backend == "lxml":
+        return _wikipedia_lxml(html, max_paragraphs)
+    if backend == "bs4":
+        return _wikipedia_bs4(html, max_paragraphs)
+    raise ValueError(f"Unknown HTML backend: {backend}")
+
+
+def extract_page_text(html, backend=None):
+    """
+    Extract the main text of an arbitrary web page as one whitespace-collapsed string.
+
+    Scripts, styles and navigation are removed, and the first element matching
+    MAIN_CONTENT_SELECTORS is used if any, else the whole document.
+
+    Args:
+        html (str): The page HTML.
+        backend (str): "lxml" or "bs4"; None picks default_backend().
+
+    Returns:
+        dict: {"text": the extracted text}.
+    """
+    backend = backend or default_backend()
+    if backend == "lxml":
+        return _page_text_lxml(html)
+    if backend == "bs4":
+        return _page_text_bs4(html)
+    raise ValueError(f"Unknown HTML backend: {backend}")
+
+
+def _wikipedia_bs4(html, max_paragraphs=None):
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Extract the article title
+    heading = soup.find('h1', {'id': 'firstHeading'})
+    title = heading.text if heading else "Unknown Title"
+
+    # Find the infobox (right sidebar with key facts)
+    infobox = soup.find('table', {'class': 'infobox'})
+    infobox_data = ""
+    if infobox:
+        # Extract key-value pairs from infobox
+        for row in infobox.find_all('tr'):
+            header = row.find('th')
+            value = row.find('td')
+            if header and value:
+                infobox_data += f"{header.get_text(strip=True)}: {value.get_text(strip=True)}\n"
+
+    # Body paragraphs under their section heading; the lead section has no heading
+    sections = [("", [])]
+    paragraph_count = 0
+    content_div = soup.find('div', {'id': 'mw-content-text'})
+    if content_div:
+        # Citation markers like "[1]" are noise in a prompt
+        for reference in content_div.find_all('sup', {'class': 'reference'}):
+            reference.decompose()
+        for element in content_div.find_all(['h2', 'h3', 'p']):
+            if max_paragraphs is not None and paragraph_count >= max_paragraphs:
+                break
+            text = _collapse(element.get_text())
+            if element.name == 'p':
+                if text and not element.find_parent('table'):
+                    sections[-1][1].append(text)
+                    paragraph_count += 1
+            else:
+                sections.append((text, []))
+
+    return {"title": title, "infobox": infobox_data, "sections": sections}
+
+
+def _has_class(element, name):
+    return name in (element.get("class") or "").split()
+
+
+def _is_reference(element):
+    return element.tag == "sup" and _has_class(element, "reference")
+
+
+def _text_nodes(element, skip=None):
+    """Text of an lxml element in document order, like BeautifulSoup's strings (no comments or scripts)."""
+    if element.text and element.tag not in ("script", "style"):
+        yield element.text
+    for child in element:
+        # Comments and processing instructions have a non-string tag
+        if isinstance(child.tag, str) and not (skip and skip(child)):
+            yield from _text_nodes(child, skip)
+        if child.tail:
+            yield child.tail
+
+
+def _wikipedia_lxml(html, max_paragraphs=None):
+    parser = etree.HTMLPullParser(events=("start", "end"))
+    title = "Unknown Title"
+    title_element = None
+    infobox = None
+    infobox_data = ""
+    content_div = None
+    sections = [("", [])]
+    paragraph_count = 0
+
+    def handle(event, element):
+        """Process one parser event; returns True once nothing else is needed."""
+        nonlocal title, title_element, infobox, infobox_data, content_div, paragraph_count
+        tag = element.tag
+        if event == "start":
+            if tag == "h1" and title_element is None and element.get("id") == "firstHeading":
+                title_element = element
+            elif tag == "table" and infobox is None and _has_class(element, "infobox"):
+                infobox = element
+            elif tag == "div" and content_div is None and element.get("id") == "mw-content-text":
+                content_div = element
+            return False
+
+        if element is title_element:
+            title = "".join(_text_nodes(element))
+        elif element is infobox:
+            for row in element.iter("tr"):
+                header = next(row.iter("th"), None)
+                value = next(row.iter("td"), None)
+                if header is not None and value is not None:
+                    header_text = "".join(s.strip() for s in _text_nodes(header))
+                    value_text = "".join(s.strip() for s in _text_nodes(value))
+                    infobox_data += f"{header_text}: {value_text}\n"
+        elif element is content_div:
+            return True
+        elif tag in ("h2", "h3", "p") and content_div is not None \
+                and any(ancestor is content_div for ancestor in element.iterancestors()):
+            text = _collapse("".join(_text_nodes(element, skip=_is_reference)))
+            if tag != "p":
+                sections.append((text, []))
+            elif text and next(element.iterancestors("table"), None) is None:
+                sections[-1][1].append(text)
+                paragraph_count += 1
+                return max_paragraphs is not None and paragraph_count >= max_paragraphs
+        return False
+
+    done = False
+    for start in range(0, len(html), FEED_CHARS):
+        parser.feed(html[start:start + FEED_CHARS])
+        if any(handle(event, element) for event, element in parser.read_events()):
+            done = True
+            break
+    if not done:
+        parser.close()
+        any(handle(event, element) for event, element in parser.read_events())
+
+    return {"title": title, "infobox": infobox_data, "sections": sections}
+
+
+def _page_text_bs4(html):
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Remove non-content elements
+    for element in soup(NON_CONTENT_TAGS):
+        element.decompose()
+
+    # Try to find main content
+    main_content = None
+    for selector in MAIN_CONTENT_SELECTORS:
+        main_content = soup.select_one(selector)
+        if main_content:
+            break
+
+    # If main content found, use it; otherwise use the whole body
+    text = (main_content or soup).get_text(separator=' ', strip=True)
+    return {"text": _collapse(text)}
+
+
+def _page_text_lxml(html):
+    if not html.strip():
+        return {"text": ""}
+    root = lxml_html.document_fromstring(html)
+
+    # Remove non-content elements, keeping the text that follows them
+    for element in root.xpath("|".join(f"//{tag}" for tag in NON_CONTENT_TAGS)):
+        element.drop_tree()
+
+    main_content = None
+    for xpath in _MAIN_CONTENT_XPATHS:
+        matches = root.xpath(xpath)
+        if matches:
+            main_content = matches[0]
+            break
+
+    element = main_content if main_content is not None else root
+    text = " ".join(s.strip() for s in _text_nodes(element) if s.strip())
+    return {"text": _collapse(text)}
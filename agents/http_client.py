@@ -0,0 +1,109 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+
+# Content types the page extractors can handle; anything else is skipped before its body is read
+TEXT_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+# URLs that are never worth requesting (documents, archives and media we cannot parse)
+BINARY_EXTENSIONS = (
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".zip", ".gz", ".rar",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".mp3", ".mp4", ".avi", ".mov",
+)
+
+
+class UnsupportedContentError(Exception):
+    """Raised for URLs or responses whose content type cannot be extracted."""
+
+
+class HTTPClient:
+    def __init__(self, headers=None, timeout=15, max_bytes=2 * 1024 * 1024, pool_size=16):
+        """
+        Initialize the HTTPClient.
+
+        All fetches share one requests.Session, so connections (and their TCP
+        and TLS setup) are kept alive and reused between pages of the same host.
+        Bodies are streamed and cut off at max_bytes, and binary responses are
+        rejected from their headers without downloading the body.
+
+        Args:
+            headers (dict): Headers sent with every request (e.g. User-Agent).
+            timeout (float): Connect and read timeout in seconds.
+            max_bytes (int): Maximum number of (decompressed) body bytes read per page.
+            pool_size (int): Connections kept per host, and hosts kept in the pool.
+        """
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.pool_size = pool_size
+        self.session = self._create_session()
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "Accept": "text/html,application/xhtml+xml;q=0.9,text/plain;q=0.8",
+            "Accept-Encoding": "gzip, deflate",
+        })
+        session.headers.update(self.headers)
+        return session
+
+    def reset(self):
+        """
+        Drop all pooled connections and start a new session.
+
+        Call in a freshly forked worker: sockets inherited from the parent
+        process must not be shared with it.
+        """
+        self.session.close()
+        self.session = self._create_session()
+
+    def close(self):
+        self.session.close()
+
+    def fetch_text(self, url):
+        """
+        Download a text page, reading at most max_bytes of its body.
+
+        Compressed responses are decompressed while streaming, so the cap applies
+        to the decompressed size. A page cut off at the cap is returned truncated.
+
+        Args:
+            url (str): URL to fetch.
+
+        Returns:
+            str: The decoded page text.
+
+        Raises:
+            UnsupportedContentError: If the URL or response is not a text type.
+            requests.RequestException: On connection errors and HTTP error statuses.
+        """
+        if urlparse(url).path.lower().endswith(BINARY_EXTENSIONS):
+            raise UnsupportedContentError(f"Skipping non-HTML URL: {url}")
+
+        response = self.session.get(url, timeout=self.timeout, stream=True)
+        try:
+            response.raise_for_status()
+
+            content_type = response.headers.get("Content-Type", "")
+            mime_type = content_type.split(";")[0].strip().lower()
+            if mime_type and mime_type not in TEXT_CONTENT_TYPES:
+                raise UnsupportedContentError(f"Skipping {mime_type} content at {url}")
+
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                body += chunk
+                if len(body) >= self.max_bytes:
+                    del body[self.max_bytes:]
+                    break
+        finally:
+            response.close()
+
+        # requests assumes ISO-8859-1 for text/* without a charset; web pages are almost always UTF-8
+        encoding = response.encoding if "charset=" in content_type.lower() else "utf-8"
+        try:
+            return body.decode(encoding or "utf-8", errors="replace")
+        except LookupError:  # unknown charset name
+            return body.decode("utf-8", errors="replace")
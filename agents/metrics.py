@@ -0,0 +1,182 @@
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from agents.process_memory import read_memory_usage
+
+# LLM calls and scraping take seconds, so extend the default buckets upwards
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "HTTP requests by route and status code.",
+    ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "agent_stage_duration_seconds",
+    "Latency of individual agent stages (retrieval, scraping, generation, ...).",
+    ["agent", "stage"],
+    buckets=LATENCY_BUCKETS
+)
+AGENT_ERRORS = Counter(
+    "agent_errors_total",
+    "Errors raised or swallowed inside agents.",
+    ["agent", "stage"]
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Gemini tokens reported in usage metadata.",
+    ["agent", "kind"]
+)
+# "liveall" keeps one series per live worker (labelled by pid) in multiprocess mode
+WORKER_MEMORY = Gauge(
+    "worker_memory_bytes",
+    "Memory of this process from /proc/self/smaps_rollup (rss, pss, shared, private).",
+    ["kind"],
+    multiprocess_mode="liveall"
+)
+
+_extra_collectors = []
+
+
+@contextmanager
+def stage_timer(agent, stage):
+    """
+    Time a block of agent work; exceptions are counted as errors and re-raised.
+
+    Args:
+        agent (str): Agent name, e.g. "history".
+        stage (str): Stage name, e.g. "embedding" or "generation".
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        AGENT_ERRORS.labels(agent=agent, stage=stage).inc()
+        raise
+    finally:
+        STAGE_LATENCY.labels(agent=agent, stage=stage).observe(time.perf_counter() - start)
+
+
+def record_error(agent, stage):
+    """Count an error that the agent handles itself instead of raising."""
+    AGENT_ERRORS.labels(agent=agent, stage=stage).inc()
+
+
+def record_token_usage(agent, response):
+    """Add the prompt and output token counts of a Gemini response."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, attribute in (("prompt", "prompt_token_count"), ("output", "candidates_token_count")):
+        count = getattr(usage, attribute, 0) or 0
+        if count:
+            LLM_TOKENS.labels(agent=agent, kind=kind).inc(count)
+
+
+def generate_content(agent, model, *args, **kwargs):
+    """
+    Call model.generate_content, recording its latency, token usage and errors.
+
+    Args:
+        agent (str): Agent name used as the metric label.
+        model (genai.GenerativeModel): The Gemini model.
+
+    Returns:
+        The Gemini response.
+    """
+    with stage_timer(agent, "generation"):
+        response = model.generate_content(*args, **kwargs)
+    record_token_usage(agent, response)
+    return response
+
+
+def record_worker_memory():
+    """
+    Update the worker memory gauges from smaps_rollup.
+
+    Returns:
+        dict: The memory usage, or None when smaps_rollup is unavailable.
+    """
+    usage = read_memory_usage()
+    if usage is None:
+        return None
+    for kind in ("rss", "pss", "shared", "private"):
+        WORKER_MEMORY.labels(kind=kind).set(usage[kind])
+    return usage
+
+
+class ResponseCacheCollector:
+    """Exports ResponseCache hit/miss counts, which live in its SQLite file."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def collect(self):
+        stats = self.cache.stats()
+
+        lookups = CounterMetricFamily(
+            "response_cache_lookups",
+            "Response cache lookups by agent and result.",
+            labels=["agent", "result"]
+        )
+        hit_rate = GaugeMetricFamily(
+            "response_cache_hit_rate",
+            "Fraction of response cache lookups that were hits.",
+            labels=["agent"]
+        )
+        for agent, agent_stats in stats["agents"].items():
+            lookups.add_metric([agent, "hit"], agent_stats["hits"])
+            lookups.add_metric([agent, "miss"], agent_stats["misses"])
+            hit_rate.add_metric([agent], agent_stats["hit_rate"])
+        yield lookups
+        yield hit_rate
+
+        yield GaugeMetricFamily("response_cache_entries", "Entries in the response cache.", value=stats["entries"])
+        yield GaugeMetricFamily("response_cache_bytes", "Bytes stored in the response cache.", value=stats["total_bytes"])
+
+
+def register_collector(collector):
+    """Register a custom collector so it is included in render_metrics()."""
+    _extra_collectors.append(collector)
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        REGISTRY.register(collector)
+
+
+def render_metrics():
+    """
+    Render all metrics in the Prometheus text format.
+
+    When PROMETHEUS_MULTIPROC_DIR is set (e.g. under gunicorn), metrics from
+    every worker process are aggregated.
+
+    Returns:
+        tuple: (body, content_type)
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _extra_collectors:
+            registry.register(collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,109 @@
+import os
+import json
+import sqlite3
+from contextlib import contextmanager
+
+
+class ParentStore:
+    def __init__(self, db_path):
+        """
+        Initialize the ParentStore.
+
+        Small-to-big retrieval embeds fine-grained child chunks but puts their
+        parent window (a page or section) into the prompt. Parent texts are
+        stored once per collection, together with a chunk ID -> parent ID table
+        written at ingestion time.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+        """
+        self.db_path = db_path
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS parents (
+                    collection TEXT NOT NULL,
+                    parent_id TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    PRIMARY KEY (collection, parent_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_parents (
+                    collection TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    parent_id TEXT NOT NULL,
+                    PRIMARY KEY (collection, chunk_id)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def replace_collection(self, collection, parents, chunk_parents):
+        """
+        Store the parent windows of a collection, replacing any previous ingestion.
+
+        Args:
+            collection (str): Collection name.
+            parents (list): Dicts with "parent_id", "text" and any other metadata fields.
+            chunk_parents (dict): Chunk ID (as stored in Chroma) -> parent ID.
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM parents WHERE collection = ?", (collection,))
+            conn.execute("DELETE FROM chunk_parents WHERE collection = ?", (collection,))
+            conn.executemany(
+                "INSERT INTO parents (collection, parent_id, text, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (collection, parent["parent_id"], parent["text"], json.dumps(
+                        {key: value for key, value in parent.items() if key not in ("parent_id", "text")}
+                    ))
+                    for parent in parents
+                ]
+            )
+            conn.executemany(
+                "INSERT INTO chunk_parents (collection, chunk_id, parent_id) VALUES (?, ?, ?)",
+                [(collection, chunk_id, parent_id) for chunk_id, parent_id in chunk_parents.items()]
+            )
+
+    def delete_collection(self, collection):
+        """Remove a collection's parents, e.g. when it is re-ingested without them."""
+        self.replace_collection(collection, [], {})
+
+    def lookup(self, collection, chunk_ids):
+        """
+        Find the parent windows of several chunks at once.
+
+        Args:
+            collection (str): Collection name.
+            chunk_ids (list): Chunk IDs as returned by the vector search.
+
+        Returns:
+            dict: Chunk ID -> {"parent_id", "text", "metadata"} for chunks that have a parent.
+        """
+        if not chunk_ids:
+            return {}
+        placeholders = ",".join("?" * len(chunk_ids))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT c.chunk_id, p.parent_id, p.text, p.metadata FROM chunk_parents c "
+                f"JOIN parents p ON p.collection = c.collection AND p.parent_id = c.parent_id "
+                f"WHERE c.collection = ? AND c.chunk_id IN ({placeholders})",
+                [collection, *chunk_ids]
+            ).fetchall()
+        return {
+            chunk_id: {"parent_id": parent_id, "text": text, "metadata": json.loads(metadata)}
+            for chunk_id, parent_id, text, metadata in rows
+        }
@@ -0,0 +1,123 @@
+import re
+import math
+from collections import Counter
+
+import numpy as np
+
+from agents.text_utils import split_into_segments
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+# Question words and function words carry no signal about which passage answers a question
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be been before being between both but by can could did do does
+during for from had has have he her his how i if in into is it its me more most my no not of on or other our
+she so such than that the their them then there these they this those through to under up was were what when
+where which while who whom why will with would you your
+""".split())
+
+
+def tokenize(text):
+    """Lowercased word tokens of a text, without stopwords."""
+    return [token for token in _WORD_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_passages(text, max_chars=500):
+    """
+    Split scraped text into passages of whole paragraphs or sentences.
+
+    Args:
+        text (str): Page text; blank lines separate paragraphs.
+        max_chars (int): Maximum number of characters per passage.
+
+    Returns:
+        list: Passage strings in document order.
+    """
+    return [body.strip() for body, _ in split_into_segments(text, max_chars) if body.strip()]
+
+
+def bm25_scores(query_tokens, passage_tokens, k1=1.5, b=0.75):
+    """
+    Score passages against a query with Okapi BM25, using the passages as the corpus.
+
+    Args:
+        query_tokens (list): Tokens of the query.
+        passage_tokens (list): Token lists, one per passage.
+        k1 (float): Term-frequency saturation.
+        b (float): Length normalization.
+
+    Returns:
+        np.ndarray: One score per passage.
+    """
+    count = len(passage_tokens)
+    scores = np.zeros(count, dtype=np.float64)
+    if not count or not query_tokens:
+        return scores
+
+    lengths = np.array([len(tokens) for tokens in passage_tokens], dtype=np.float64)
+    average_length = max(lengths.mean(), 1.0)
+    frequencies = [Counter(tokens) for tokens in passage_tokens]
+    document_frequency = Counter(token for tokens in passage_tokens for token in set(tokens))
+
+    for token in set(query_tokens):
+        df = document_frequency.get(token, 0)
+        if not df:
+            continue
+        idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+        tf = np.array([frequency.get(token, 0) for frequency in frequencies], dtype=np.float64)
+        scores += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths / average_length))
+    return scores
+
+
+def select_passages(passages, query, max_chars=1500, embedding_function=None, rerank_top=12, lead_bonus=0.1):
+    """
+    Pick the passages of a page that best answer a question, within a character budget.
+
+    Passages are scored lexically with BM25 (normalized to 0..1), and the first
+    passage gets a small bonus since page leads tend to summarize the topic.
+    With an embedding function, the best `rerank_top` candidates are re-scored
+    by averaging that with their cosine similarity to the question. The best
+    passages are packed until the budget is used and returned in page order.
+
+    Args:
+        passages (list): Passage strings in document order.
+        query (str): The user's question.
+        max_chars (int): Character budget for the selected passages.
+        embedding_function (callable): Maps a list of strings to a list of embeddings
+            (e.g. SentenceTransformerEmbeddingFunction); None for lexical scoring only.
+        rerank_top (int): Number of lexical candidates re-scored with embeddings.
+        lead_bonus (float): Score added to the first passage.
+
+    Returns:
+        list: (passage_index, passage) pairs in document order.
+    """
+    if not passages:
+        return []
+
+    scores = bm25_scores(tokenize(query), [tokenize(passage) for passage in passages])
+    if scores.max() > 0:
+        scores /= scores.max()
+    scores[0] += lead_bonus
+
+    # Stable sort, so passages without any lexical match keep page order
+    order = np.argsort(-scores, kind="stable")
+    if embedding_function is not None and len(passages) > 1:
+        candidates = order[:rerank_top]
+        embeddings = np.asarray(
+            embedding_function([query] + [passages[i] for i in candidates]), dtype=np.float32
+        )
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        similarities = embeddings[1:] @ embeddings[0]
+        combined = 0.5 * scores[candidates] + 0.5 * similarities
+        order = np.concatenate([candidates[np.argsort(-combined, kind="stable")], order[rerank_top:]])
+
+    selected = []
+    used_chars = 0
+    for i in order:
+        length = len(passages[i]) + 1
+        if selected and used_chars + length > max_chars:
+            continue
+        selected.append(int(i))
+        used_chars += length
+
+    return [(i, passages[i]) for i in sorted(selected)]
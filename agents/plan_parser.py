@@ -0,0 +1,178 @@
+import re
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t#]*$', re.MULTILINE)
+
+# Top-level numbered list items ("1. ..." or "1) ...", at most three spaces of indent)
+STEP_ITEM_PATTERN = re.compile(r'^ {0,3}(\d+)[.)][ \t]+(.+)$', re.MULTILINE)
+
+# Headings that are themselves steps, e.g. "Step 2: Research" or "2. Research"
+STEP_HEADING_PATTERN = re.compile(r'^(?:step\s*)?(\d+)\s*[.:)\-]\s*(.*)$', re.IGNORECASE)
+
+LIST_ITEM_PATTERN = re.compile(r'^\s*(?:[-*+]|\d+[.)])[ \t]+(.+)$', re.MULTILINE)
+BOLD_PATTERN = re.compile(r'\*\*(.+?)\*\*')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$')
+
+
+def _clean_inline(text):
+    """Strip inline markdown emphasis from a title."""
+    return re.sub(r'[*_`]+', '', text).strip()
+
+
+def _table_cells(line):
+    return [cell.strip() for cell in line.strip().strip('|').split('|')]
+
+
+def _parse_tables(text, section_id):
+    """Parse markdown tables in a section into row dicts keyed by header cell."""
+    rows = []
+    lines = text.split('\n')
+    i = 0
+    while i < len(lines) - 1:
+        if '|' in lines[i] and TABLE_SEPARATOR_PATTERN.match(lines[i + 1]):
+            headers = [_clean_inline(cell) for cell in _table_cells(lines[i])]
+            i += 2
+            while i < len(lines) and '|' in lines[i] and lines[i].strip():
+                cells = [_clean_inline(cell) for cell in _table_cells(lines[i])]
+                rows.append({
+                    "section_id": section_id,
+                    "cells": dict(zip(headers, cells))
+                })
+                i += 1
+        else:
+            i += 1
+    return rows
+
+
+def parse_plan(plan_text):
+    """
+    Parse a generated markdown plan into sections, steps, milestones and timeline rows.
+
+    Sections and steps carry character offsets into plan_text so a single part
+    can be regenerated and spliced back without touching the rest. A section
+    spans up to the next heading of the same or a higher level, so it includes
+    its subsections; steps, milestones and tables are attributed to the
+    innermost section containing them.
+
+    Args:
+        plan_text (str): The markdown plan.
+
+    Returns:
+        dict: "sections", "steps", "milestones" and "timeline" lists.
+    """
+    headings = list(HEADING_PATTERN.finditer(plan_text))
+
+    sections = []
+    # Where each section's own text ends: the next heading of any level
+    content_ends = []
+    if not headings or headings[0].start() > 0:
+        end = headings[0].start() if headings else len(plan_text)
+        if plan_text[:end].strip():
+            sections.append({"title": "", "level": 0, "start": 0, "end": end})
+            content_ends.append(end)
+    for i, heading in enumerate(headings):
+        level = len(heading.group(1))
+        end = next(
+            (later.start() for later in headings[i + 1:] if len(later.group(1)) <= level),
+            len(plan_text)
+        )
+        sections.append({
+            "title": _clean_inline(heading.group(2)),
+            "level": level,
+            "start": heading.start(),
+            "end": end
+        })
+        content_ends.append(headings[i + 1].start() if i + 1 < len(headings) else len(plan_text))
+    for i, section in enumerate(sections):
+        section["id"] = f"section-{i}"
+
+    steps = []
+    milestones = []
+    timeline = []
+    for section, content_end in zip(sections, content_ends):
+        body = plan_text[section["start"]:content_end]
+
+        # A heading such as "Step 2: Research" makes the whole section one step
+        heading_step = STEP_HEADING_PATTERN.match(section["title"]) if section["level"] else None
+        if heading_step:
+            steps.append({
+                "section_id": section["id"],
+                "number": int(heading_step.group(1)),
+                "title": _clean_inline(heading_step.group(2)) or section["title"],
+                "start": section["start"],
+                "end": section["end"]
+            })
+        else:
+            items = list(STEP_ITEM_PATTERN.finditer(body))
+            for j, item in enumerate(items):
+                item_end = items[j + 1].start() if j + 1 < len(items) else len(body.rstrip())
+                steps.append({
+                    "section_id": section["id"],
+                    "number": int(item.group(1)),
+                    "title": _clean_inline(item.group(2)),
+                    "start": section["start"] + item.start(),
+                    "end": section["start"] + item_end
+                })
+
+        if "milestone" in section["title"].lower():
+            for item in LIST_ITEM_PATTERN.finditer(body):
+                milestones.append({"section_id": section["id"], "text": _clean_inline(item.group(1))})
+        else:
+            for bold in BOLD_PATTERN.finditer(body):
+                if "milestone" in bold.group(1).lower():
+                    milestones.append({"section_id": section["id"], "text": _clean_inline(bold.group(1))})
+
+        timeline.extend(_parse_tables(body, section["id"]))
+
+    for i, step in enumerate(steps):
+        step["id"] = f"step-{i}"
+
+    return {
+        "sections": sections,
+        "steps": steps,
+        "milestones": milestones,
+        "timeline": timeline
+    }
+
+
+def find_part(structure, part_id):
+    """
+    Find a section or step by ID.
+
+    Returns:
+        tuple: (kind, part) where kind is "section" or "step", or (None, None).
+    """
+    for kind in ("section", "step"):
+        for part in structure[kind + "s"]:
+            if part["id"] == part_id:
+                return kind, part
+    return None, None
+
+
+def plan_outline(structure):
+    """Build a compact outline (section and step titles) to use as prompt context."""
+    lines = []
+    steps_by_section = {}
+    for step in structure["steps"]:
+        steps_by_section.setdefault(step["section_id"], []).append(step)
+    for section in structure["sections"]:
+        if section["title"]:
+            lines.append(f"{'  ' * max(section['level'] - 1, 0)}- {section['title']}")
+        for step in steps_by_section.get(section["id"], []):
+            if step["start"] != section["start"]:
+                lines.append(f"{'  ' * section['level']}{step['number']}. {step['title']}")
+    return "\n".join(lines)
+
+
+def splice_part(plan_text, part, replacement):
+    """
+    Replace one part of the plan, keeping the whitespace that followed it.
+
+    A section's span includes its subsections, so the replacement must contain
+    them too (refine_plan asks the model to keep them).
+
+    Returns:
+        str: The updated plan text.
+    """
+    original = plan_text[part["start"]:part["end"]]
+    trailing = original[len(original.rstrip()):]
+    return plan_text[:part["start"]] + replacement.strip() + trailing + plan_text[part["end"]:]
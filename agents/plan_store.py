@@ -0,0 +1,132 @@
+import os
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class PlanStore:
+    def __init__(self, db_path, max_memory_bytes=8 * 1024 * 1024):
+        """
+        Initialize the PlanStore.
+
+        Plans are persisted in a SQLite file. Recently used plans are kept in an
+        in-memory LRU whose total size is capped, so a long-running server does
+        not grow with every plan it has ever created.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+            max_memory_bytes (int): Maximum total size of plans held in memory.
+        """
+        self.db_path = db_path
+        self.max_memory_bytes = max_memory_bytes
+
+        self._lru = OrderedDict()
+        self._lru_bytes = 0
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plans (
+                    id TEXT PRIMARY KEY,
+                    goal TEXT NOT NULL,
+                    deadline TEXT,
+                    created_at TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_plans_created_at ON plans(created_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _remember(self, plan_id, plan, size):
+        with self._lock:
+            if plan_id in self._lru:
+                self._lru_bytes -= self._lru.pop(plan_id)[1]
+            # Plans larger than the whole budget are served from disk only
+            if size > self.max_memory_bytes:
+                return
+            self._lru[plan_id] = (plan, size)
+            self._lru_bytes += size
+            while self._lru_bytes > self.max_memory_bytes:
+                _, (_, evicted_size) = self._lru.popitem(last=False)
+                self._lru_bytes -= evicted_size
+
+    def save(self, plan):
+        """
+        Insert or replace a plan.
+
+        Args:
+            plan (dict): Plan with at least "id", "goal", "deadline" and "created_at".
+        """
+        data = json.dumps(plan, ensure_ascii=False)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO plans (id, goal, deadline, created_at, data) VALUES (?, ?, ?, ?, ?)",
+                (plan["id"], plan["goal"], plan.get("deadline"), plan["created_at"], data)
+            )
+        self._remember(plan["id"], plan, len(data.encode("utf-8")))
+
+    def get(self, plan_id):
+        """
+        Get a plan by ID.
+
+        Returns:
+            dict: The plan, or None if it does not exist.
+        """
+        with self._lock:
+            entry = self._lru.get(plan_id)
+            if entry is not None:
+                self._lru.move_to_end(plan_id)
+                return entry[0]
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM plans WHERE id = ?", (plan_id,)).fetchone()
+        if row is None:
+            return None
+        plan = json.loads(row[0])
+        self._remember(plan_id, plan, len(row[0].encode("utf-8")))
+        return plan
+
+    def list(self, limit=20, offset=0):
+        """
+        List plans, newest first, without their full text.
+
+        Returns:
+            list: Plan summaries with id, goal, deadline and created_at.
+        """
+        limit = max(1, min(int(limit), 100))
+        offset = max(0, int(offset))
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, goal, deadline, created_at FROM plans "
+                "ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+        return [
+            {"id": row[0], "goal": row[1], "deadline": row[2], "created_at": row[3]}
+            for row in rows
+        ]
+
+    def count(self):
+        """Returns the number of stored plans."""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+
+    def memory_usage(self):
+        """Returns the number of plans and bytes currently held in memory."""
+        with self._lock:
+            return {"plans": len(self._lru), "bytes": self._lru_bytes, "max_bytes": self.max_memory_bytes}
@@ -5,33 +5,45 @@ import google.generativeai as genai
 import uuid
 from datetime import datetime
 
+from agents.plan_store import PlanStore
+from agents.plan_parser import parse_plan, find_part, plan_outline, splice_part
+from agents.metrics import generate_content
+
 # Load environment variables
 load_dotenv()
 
 class PlannerAgent:
-    def __init__(self, model_name="gemini-1.5-flash"):
+    # Part of the response cache key (see ResponseCache.get_or_compute)
+    PROMPT_VERSION = "2"
+
+    def __init__(self, model_name="gemini-1.5-flash", cache=None, plan_store=None):
         """
         Initialize the PlannerAgent.
 
         Args:
             model_name (str): Gemini model name.
+            cache (ResponseCache): Optional shared response cache.
+            plan_store (PlanStore): Persistent store for created plans.
         """
         google_api_key = os.getenv("GOOGLE_API_KEY")
         if not google_api_key:
             raise ValueError("GOOGLE_API_KEY environment variable not set")
         genai.configure(api_key=google_api_key)
 
+        self.model_name = model_name
         self.model = genai.GenerativeModel(model_name)
+        self.cache = cache
         
-        self.plans = {}
+        self.plans = plan_store or PlanStore("processed_data/plans.sqlite3")
 
-    def create_plan(self, goal, deadline=None):
+    def create_plan(self, goal, deadline=None, use_cache=True):
         """
         Creates a detailed plan to achieve the specified goal by the deadline.
 
         Args:
             goal (str): The goal to achieve.
             deadline (str): The deadline for achieving the goal (optional).
+            use_cache (bool): Whether to serve the plan text from the response cache.
 
         Returns:
             dict: A structured plan with steps, timeline, and resources.
@@ -64,8 +76,22 @@ Please format the plan with:
 Make the output professional and visually appealing.
 """
 
-        response = self.model.generate_content(prompt)
-        plan_text = response.text.strip()
+        def generate():
+            response = generate_content("planner", self.model, prompt)
+            return response.text.strip()
+
+        cached = False
+        if self.cache:
+            plan_text, cached = self.cache.get_or_compute(
+                "planner",
+                self.model_name,
+                self.PROMPT_VERSION,
+                {"goal": goal, "deadline": deadline or ""},
+                generate,
+                use_cache=use_cache
+            )
+        else:
+            plan_text = generate()
         
         # Create a structured plan
         plan_id = str(uuid.uuid4())
@@ -76,10 +102,130 @@ Make the output professional and visually appealing.
             "goal": goal,
             "deadline": deadline,
             "plan_text": plan_text,
-            "created_at": created_date
+            "structure": parse_plan(plan_text),
+            "created_at": created_date,
+            "revision": 0,
+            "cached": cached
         }
         
         # Store the plan
-        self.plans[plan_id] = plan
+        self.plans.save(plan)
         
-        return plan
\ No newline at end of file
+        return plan
+
+    def refine_plan(self, plan_id, part_id, instructions, use_cache=True):
+        """
+        Regenerate a single section or step of a plan and splice it back in.
+
+        Only the goal, the deadline, a compact outline of the plan and the part
+        being refined are sent to the model, so the cost does not grow with the
+        length of the whole plan.
+
+        Args:
+            plan_id (str): ID of the plan.
+            part_id (str): ID of a section ("section-N") or step ("step-N").
+            instructions (str): What should change in that part.
+            use_cache (bool): Whether to serve the regenerated part from the response cache.
+
+        Returns:
+            dict: The updated plan or error.
+        """
+        if not instructions:
+            return {"error": "No instructions provided"}
+
+        stored = self.plans.get(plan_id)
+        if stored is None:
+            return {"error": f"Plan with ID {plan_id} not found"}
+
+        # The store hands out its cached copy; never mutate it in place
+        plan = dict(stored)
+        plan_text = plan["plan_text"]
+        structure = plan.get("structure") or parse_plan(plan_text)
+
+        kind, part = find_part(structure, part_id)
+        if part is None:
+            return {"error": f"Part {part_id} not found in plan {plan_id}"}
+
+        current = plan_text[part["start"]:part["end"]].strip()
+        outline = plan_outline(structure)
+        deadline_str = f"\nDeadline: {plan['deadline']}" if plan.get("deadline") else ""
+
+        prompt = f"""
+You are revising one {kind} of an existing action plan.
+Goal: {plan['goal']}{deadline_str}
+
+Outline of the full plan:
+{outline}
+
+Current {kind}:
+{current}
+
+Requested change: {instructions}
+
+Rewrite only this {kind}, including any subsections it contains; do not add parts of the
+plan that come after it. Keep the same markdown heading levels and numbering so it fits
+back into the plan, and return only the rewritten markdown without any commentary.
+"""
+
+        def generate():
+            response = generate_content("planner", self.model, prompt)
+            return response.text.strip()
+
+        cached = False
+        if self.cache:
+            replacement, cached = self.cache.get_or_compute(
+                "planner_refine",
+                self.model_name,
+                self.PROMPT_VERSION,
+                {"goal": plan["goal"], "deadline": plan.get("deadline") or "", "kind": kind,
+                 "outline": outline, "current": current, "instructions": instructions},
+                generate,
+                use_cache=use_cache
+            )
+        else:
+            replacement = generate()
+
+        if not replacement:
+            return {"error": "The model returned an empty revision"}
+
+        plan_text = splice_part(plan_text, part, replacement)
+        plan["plan_text"] = plan_text
+        plan["structure"] = parse_plan(plan_text)
+        plan["revision"] = plan.get("revision", 0) + 1
+        plan["updated_at"] = datetime.now().isoformat()
+        plan["refined"] = {"part_id": part_id, "kind": kind, "cached": cached}
+
+        self.plans.save(plan)
+
+        return plan
+
+    def get_plan(self, plan_id):
+        """
+        Get a previously created plan.
+
+        Args:
+            plan_id (str): ID of the plan.
+
+        Returns:
+            dict: The plan object or error.
+        """
+        plan = self.plans.get(plan_id)
+        if plan is None:
+            return {"error": f"Plan with ID {plan_id} not found"}
+        return plan
+
+    def list_plans(self, limit=20, offset=0):
+        """
+        List previously created plans, newest first.
+
+        Args:
+            limit (int): Maximum number of plans to return.
+            offset (int): Number of plans to skip.
+
+        Returns:
+            dict: Plan summaries (without the plan text) and the total count.
+        """
+        return {
+            "plans": self.plans.list(limit=limit, offset=offset),
+            "total": self.plans.count()
+        }
\ No newline at end of file
@@ -0,0 +1,83 @@
+import os
+import sys
+import argparse
+
+# smaps_rollup fields (in kB) and the keys they are reported under
+SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+    "Swap": "swap",
+}
+
+
+def read_memory_usage(pid="self"):
+    """
+    Read a process's memory breakdown from /proc/<pid>/smaps_rollup (Linux only).
+
+    "shared" is memory also mapped by other processes, e.g. model weights
+    inherited copy-on-write from a pre-fork master; "private" is memory only
+    this process uses. PSS splits shared pages evenly between their users, so
+    summing PSS over workers gives the real total.
+
+    Args:
+        pid (int or str): Process ID, or "self".
+
+    Returns:
+        dict: Sizes in bytes, or None when smaps_rollup is unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    usage = {key: 0 for key in SMAPS_FIELDS.values()}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        key = SMAPS_FIELDS.get(name.strip())
+        if key:
+            usage[key] = int(rest.split()[0]) * 1024
+
+    usage["shared"] = usage["shared_clean"] + usage["shared_dirty"]
+    usage["private"] = usage["private_clean"] + usage["private_dirty"]
+    return usage
+
+
+def child_pids(pid):
+    """Returns the direct children of a process (e.g. gunicorn workers of the master)."""
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children", "r") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return sorted(set(children))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report unique vs. shared memory of a pre-fork server.")
+    parser.add_argument("master_pid", type=int, help="PID of the gunicorn master")
+    args = parser.parse_args(argv)
+
+    pids = [args.master_pid] + child_pids(args.master_pid)
+    print(f"{'pid':>8} {'role':>7} {'rss MB':>9} {'pss MB':>9} {'shared MB':>10} {'private MB':>11}")
+    total_pss = 0
+    for pid in pids:
+        usage = read_memory_usage(pid)
+        if usage is None:
+            continue
+        total_pss += usage["pss"]
+        role = "master" if pid == args.master_pid else "worker"
+        print(f"{pid:>8} {role:>7} {usage['rss'] / 2**20:>9.1f} {usage['pss'] / 2**20:>9.1f} "
+              f"{usage['shared'] / 2**20:>10.1f} {usage['private'] / 2**20:>11.1f}")
+    print(f"Total PSS: {total_pss / 2**20:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
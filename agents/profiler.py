@@ -0,0 +1,137 @@
+import os
+import re
+import sys
+import time
+import uuid
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename):
+    if filename.startswith(PROJECT_ROOT):
+        return os.path.relpath(filename, PROJECT_ROOT)
+    marker = "site-packages" + os.sep
+    index = filename.rfind(marker)
+    if index != -1:
+        return filename[index + len(marker):]
+    return os.path.basename(filename)
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, thread_id=None):
+        """
+        Initialize a SamplingProfiler.
+
+        A background thread periodically captures the stack of one target thread
+        via sys._current_frames(), so the profiled code runs unmodified and the
+        overhead stays proportional to the sampling rate. Work handed to other
+        threads (e.g. executor pools) is not captured.
+
+        Args:
+            interval (float): Seconds between samples.
+            thread_id (int): Thread to sample; defaults to the thread calling start().
+        """
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples = Counter()
+        self.duration = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        if self._thread is None:
+            return self
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self.duration = time.perf_counter() - self._started_at
+        return self
+
+    def collapsed(self):
+        """
+        Returns the samples in the collapsed-stack format ("frame;frame;frame count"),
+        which flamegraph.pl, speedscope and inferno read directly.
+        """
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+
+class ProfileStore:
+    # Only names generated by new_name() are served back
+    NAME_PATTERN = re.compile(r'^[\w.-]+\.collapsed$')
+
+    def __init__(self, directory, max_files=200):
+        """
+        Initialize the ProfileStore.
+
+        Profiles are written to a directory that is rotated by keeping only the
+        newest max_files profiles.
+
+        Args:
+            directory (str): Directory for profile files.
+            max_files (int): Maximum number of profiles to keep.
+        """
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def new_name(self, label):
+        label = re.sub(r'[^\w-]+', '_', label).strip('_') or "root"
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        return f"{stamp}_{label}_{uuid.uuid4().hex[:8]}.collapsed"
+
+    def save(self, name, profiler):
+        """Write a stopped profiler's samples and rotate old profiles."""
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profiler.collapsed())
+        self._rotate()
+        return path
+
+    def _rotate(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and self.NAME_PATTERN.match(entry.name):
+                    entries.append((entry.stat().st_mtime, entry.path))
+            entries.sort(reverse=True)
+            for _, path in entries[self.max_files:]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def path(self, name):
+        """
+        Returns the path of a stored profile, or None if the name is invalid or missing.
+        """
+        if not self.NAME_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
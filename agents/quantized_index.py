@@ -0,0 +1,327 @@
+import os
+import json
+import time
+
+import numpy as np
+
+from agents.vector_index import similarity_to_distance
+from agents.retrieval_filters import FILTER_FIELDS, metadata_columns, where_mask
+
+INDEX_FORMAT_VERSION = 2
+INDEX_FILES = ("centroids.npy", "list_offsets.npy", "scale.npy", "codes.npy", "vectors.npy", "ids.npy")
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def _top_k(scores, k):
+    """Indices of the k largest scores, best first."""
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def train_centroids(vectors, nlist, iterations=10, seed=0):
+    """
+    Spherical k-means on unit vectors; returns (nlist, dim) unit centroids.
+
+    Args:
+        vectors (np.ndarray): Normalized training vectors.
+        nlist (int): Number of clusters (inverted lists).
+        iterations (int): Lloyd iterations.
+        seed (int): Random seed for initialization.
+    """
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=nlist)
+        # Re-seed empty clusters with random training points
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def build_quantized_index(collection, output_dir, nlist=None, train_size=100_000, iterations=10,
+                          batch_size=1000, seed=0):
+    """
+    Build an IVF index with int8 codes from a Chroma collection and write it to output_dir.
+
+    Embeddings are streamed from the collection in batches and staged in a
+    memory-mapped file, so building never needs the whole float32 matrix in RAM.
+    Vectors are clustered into nlist inverted lists with spherical k-means on a
+    sample, and every vector is stored twice, ordered by list: as int8 codes
+    (per-dimension symmetric scale) for the candidate scan, and as float32 for
+    exact re-ranking. The filterable metadata fields are stored as columns so
+    queries can be pre-filtered without asking Chroma.
+
+    Args:
+        collection (chromadb.Collection): The collection to index.
+        output_dir (str): Directory for the index files (overwritten).
+        nlist (int): Number of inverted lists; defaults to 4 * sqrt(count).
+        train_size (int): Vectors sampled for k-means training.
+        iterations (int): k-means iterations.
+        batch_size (int): Rows fetched per collection.get() call.
+        seed (int): Random seed for sampling and initialization.
+
+    Returns:
+        dict: The index metadata written to index.json.
+    """
+    total = collection.count()
+    if total == 0:
+        raise ValueError(f"Collection '{collection.name}' is empty")
+    os.makedirs(output_dir, exist_ok=True)
+    # Remove index.json first so a half-written index is never loaded
+    metadata_path = os.path.join(output_dir, "index.json")
+    if os.path.exists(metadata_path):
+        os.remove(metadata_path)
+
+    start = time.perf_counter()
+    staging_path = os.path.join(output_dir, "staging.npy")
+    staging = None
+    ids = []
+    columns = {field: [] for field in FILTER_FIELDS}
+    max_abs = None
+    for offset in range(0, total, batch_size):
+        batch = collection.get(limit=batch_size, offset=offset, include=["embeddings", "metadatas"])
+        for field, values in metadata_columns(batch["metadatas"]).items():
+            columns[field].append(values)
+        vectors = normalize_rows(batch["embeddings"])
+        if staging is None:
+            staging = np.lib.format.open_memmap(staging_path, mode="w+", dtype=np.float32,
+                                                shape=(total, vectors.shape[1]))
+            max_abs = np.zeros(vectors.shape[1], dtype=np.float32)
+        staging[len(ids):len(ids) + len(vectors)] = vectors
+        max_abs = np.maximum(max_abs, np.abs(vectors).max(axis=0))
+        ids.extend(batch["ids"])
+    count, dim = len(ids), staging.shape[1]
+
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(count, min(train_size, count), replace=False))
+    nlist = nlist or max(1, int(4 * np.sqrt(count)))
+    centroids = train_centroids(np.asarray(staging[sample]), nlist, iterations=iterations, seed=seed)
+    nlist = len(centroids)
+
+    assignments = np.empty(count, dtype=np.int32)
+    for offset in range(0, count, batch_size):
+        assignments[offset:offset + batch_size] = np.argmax(
+            staging[offset:offset + batch_size] @ centroids.T, axis=1
+        )
+    order = np.argsort(assignments, kind="stable")
+    list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))]).astype(np.int64)
+
+    scale = np.maximum(max_abs, 1e-12) / 127.0
+    vectors_out = np.lib.format.open_memmap(os.path.join(output_dir, "vectors.npy"), mode="w+",
+                                            dtype=np.float32, shape=(count, dim))
+    codes_out = np.lib.format.open_memmap(os.path.join(output_dir, "codes.npy"), mode="w+",
+                                          dtype=np.int8, shape=(count, dim))
+    for offset in range(0, count, batch_size):
+        rows = order[offset:offset + batch_size]
+        # Read staged rows in file order, then put them back in list order
+        read_order = np.argsort(rows)
+        vectors = np.empty((len(rows), dim), dtype=np.float32)
+        vectors[read_order] = staging[rows[read_order]]
+        vectors_out[offset:offset + len(rows)] = vectors
+        codes_out[offset:offset + len(rows)] = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+    vectors_out.flush()
+    codes_out.flush()
+    del vectors_out, codes_out, staging
+    os.remove(staging_path)
+
+    np.save(os.path.join(output_dir, "centroids.npy"), centroids.astype(np.float32))
+    np.save(os.path.join(output_dir, "list_offsets.npy"), list_offsets)
+    np.save(os.path.join(output_dir, "scale.npy"), scale.astype(np.float32))
+    np.save(os.path.join(output_dir, "ids.npy"), np.asarray(ids)[order])
+    for field, values in columns.items():
+        np.save(os.path.join(output_dir, f"filter_{field}.npy"), np.concatenate(values)[order])
+
+    metadata = {
+        "format": INDEX_FORMAT_VERSION,
+        "collection": collection.name,
+        "space": (collection.metadata or {}).get("hnsw:space", "l2"),
+        "count": count,
+        "dim": dim,
+        "nlist": nlist,
+        "train_size": len(sample),
+        "build_seconds": round(time.perf_counter() - start, 3)
+    }
+    with open(metadata_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+
+class QuantizedVectorIndex:
+    def __init__(self, path, collection=None, embedding_function=None, nprobe=16, rerank=100,
+                 exact_filter_limit=20_000):
+        """
+        Load an IVF + int8 index written by build_quantized_index.
+
+        The int8 codes, float32 vectors and IDs are memory-mapped rather than read
+        into the heap: they live in the OS page cache, which every gunicorn worker
+        shares, and only the pages of probed lists are touched by a query. Only the
+        centroids are held in process memory. Documents and metadatas are fetched
+        from the Chroma collection for the final results only.
+
+        Args:
+            path (str): Index directory.
+            collection (chromadb.Collection): Collection providing documents and metadatas.
+            embedding_function (callable): Used to embed query_texts.
+            nprobe (int): Inverted lists scanned per query.
+            rerank (int): Minimum candidates re-ranked with exact float32 vectors.
+            exact_filter_limit (int): A where clause matching at most this many rows
+                is answered by an exact scan of just those rows instead of the IVF lists.
+        """
+        with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("format") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format in {path}: {self.metadata.get('format')}; "
+                             "rebuild it with src/build_quantized_index.py")
+
+        self.path = path
+        self.centroids = np.load(os.path.join(path, "centroids.npy"))
+        self.list_offsets = np.load(os.path.join(path, "list_offsets.npy"))
+        self.scale = np.load(os.path.join(path, "scale.npy"))
+        self.codes = np.load(os.path.join(path, "codes.npy"), mmap_mode="r")
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self.columns = {
+            field: np.load(os.path.join(path, f"filter_{field}.npy"), mmap_mode="r")
+            for field in FILTER_FIELDS
+        }
+        self.space = self.metadata["space"]
+
+        self.collection = collection
+        self.embedding_function = embedding_function
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.exact_filter_limit = exact_filter_limit
+
+    def count(self):
+        return int(self.metadata["count"])
+
+    def memory_usage(self):
+        """Returns the bytes held in process memory (the memory-mapped files are not counted)."""
+        return self.centroids.nbytes + self.list_offsets.nbytes + self.scale.nbytes
+
+    def disk_usage(self):
+        """Returns the size in bytes of each index file."""
+        names = list(INDEX_FILES) + [f"filter_{field}.npy" for field in FILTER_FIELDS]
+        return {name: os.path.getsize(os.path.join(self.path, name)) for name in names}
+
+    def _exact_search(self, rows, query, n_results):
+        similarities = np.asarray(self.vectors[rows]) @ query
+        best = _top_k(similarities, n_results)
+        return rows[best], similarities[best]
+
+    def search(self, query, n_results, nprobe=None, rerank=None, mask=None):
+        """
+        Approximate top-k for one normalized query.
+
+        Args:
+            mask (np.ndarray): Optional boolean pre-filter over rows (from a where clause).
+
+        Returns:
+            tuple: (row positions, exact similarities), best first.
+        """
+        # A selective filter leaves few enough rows to rank exactly
+        if mask is not None:
+            allowed = np.flatnonzero(mask)
+            if len(allowed) <= self.exact_filter_limit:
+                return self._exact_search(allowed, query, n_results)
+
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        lists = _top_k(self.centroids @ query, nprobe)
+
+        # Scan the int8 codes of the probed lists; scale folds into the query
+        scaled_query = query * self.scale
+        positions, scores = [], []
+        for list_id in lists:
+            start, end = self.list_offsets[list_id], self.list_offsets[list_id + 1]
+            if end <= start:
+                continue
+            codes = self.codes[start:end]
+            list_positions = np.arange(start, end)
+            if mask is not None:
+                keep = mask[start:end]
+                codes, list_positions = codes[keep], list_positions[keep]
+            positions.append(list_positions)
+            scores.append(codes.astype(np.float32) @ scaled_query)
+        positions = np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+        scores = np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
+        # The probed lists held too few rows passing the filter; rank all of them
+        if mask is not None and len(positions) < n_results:
+            return self._exact_search(allowed, query, n_results)
+        if not len(positions):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # Re-rank a short candidate list with the exact float32 vectors
+        candidates = positions[_top_k(scores, max(rerank or self.rerank, n_results))]
+        candidates.sort()
+        exact = self.vectors[candidates] @ query
+        best = _top_k(exact, n_results)
+        return candidates[best], exact[best]
+
+    def _fetch(self, ids, include):
+        if self.collection is None or not ids:
+            return {field: [None] * len(ids) for field in include}
+        found = self.collection.get(ids=ids, include=list(include))
+        by_id = {doc_id: i for i, doc_id in enumerate(found["ids"])}
+        return {
+            field: [found[field][by_id[doc_id]] if doc_id in by_id else None for doc_id in ids]
+            for field in include
+        }
+
+    def query(self, query_embeddings=None, query_texts=None, n_results=10, where=None,
+              include=("documents", "metadatas", "distances"), nprobe=None, rerank=None):
+        """
+        Find the approximate nearest documents, returning the same shape as collection.query.
+
+        Args:
+            query_embeddings (array-like): One embedding per query.
+            query_texts (list): Query strings, embedded with embedding_function.
+            n_results (int): Number of results per query.
+            where (dict): Chroma-style metadata filter applied before ranking.
+            include (iterable): Any of "documents", "metadatas", "distances", "embeddings".
+            nprobe (int): Overrides the number of lists scanned.
+            rerank (int): Overrides the number of candidates re-ranked exactly.
+
+        Returns:
+            dict: "ids" plus the requested fields, each a list with one list per query.
+        """
+        if query_embeddings is None:
+            if query_texts is None or self.embedding_function is None:
+                raise ValueError("query_embeddings, or query_texts with an embedding_function, are required")
+            query_embeddings = self.embedding_function(query_texts)
+
+        results = {"ids": []}
+        for field in include:
+            results[field] = []
+        stored_fields = [field for field in include if field in ("documents", "metadatas")]
+        mask = where_mask(self.columns, where, self.count()) if where else None
+        n_results = min(int(n_results), self.count() if mask is None else int(mask.sum()))
+
+        for query in normalize_rows(query_embeddings):
+            if n_results <= 0:
+                rows, similarities = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            else:
+                rows, similarities = self.search(query, n_results, nprobe=nprobe, rerank=rerank, mask=mask)
+            ids = [str(doc_id) for doc_id in self.ids[rows]]
+            results["ids"].append(ids)
+            for field, values in self._fetch(ids, stored_fields).items():
+                results[field].append(values)
+            if "distances" in results:
+                results["distances"].append(similarity_to_distance(similarities, self.space).tolist())
+            if "embeddings" in results:
+                results["embeddings"].append(np.asarray(self.vectors[rows]))
+        return results
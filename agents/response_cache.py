@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+
+
+class ResponseCache:
+    def __init__(self, db_path, max_bytes=100 * 1024 * 1024, max_age_seconds=7 * 24 * 3600):
+        """
+        Initialize the ResponseCache.
+
+        Responses are stored in a SQLite file so they survive restarts and can be
+        shared between worker processes. A new connection is opened per operation,
+        which keeps the cache safe to use across threads and after fork.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+            max_bytes (int): Maximum total size of cached values before LRU eviction.
+            max_age_seconds (int): Entries older than this are treated as expired.
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            # WAL lets readers in other processes proceed while one process writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    agent TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses(created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats (
+                    agent TEXT PRIMARY KEY,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(agent, model_name, prompt_version, inputs):
+        """
+        Build a content-addressed key for a request.
+
+        Args:
+            agent (str): Name of the agent (e.g. "translator").
+            model_name (str): Gemini model name.
+            prompt_version (str): Version of the agent's prompt template.
+            inputs (dict): The request inputs that affect the response.
+
+        Returns:
+            str: SHA-256 hex digest identifying the request.
+        """
+        payload = json.dumps(
+            [agent, model_name, prompt_version, inputs],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached value.
+
+        Returns:
+            The cached value, or None if missing or expired.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.max_age_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, agent, value):
+        """Store a value and apply the eviction policy."""
+        now = time.time()
+        serialized = json.dumps(value, ensure_ascii=False)
+        size = len(serialized.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, agent, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, agent, serialized, size, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        # Age-based eviction first, then least-recently-used until under the size cap
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC")
+        to_delete = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+
+    def _record(self, agent, hit):
+        column = "hits" if hit else "misses"
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO stats (agent, {column}) VALUES (?, 1) "
+                f"ON CONFLICT(agent) DO UPDATE SET {column} = {column} + 1",
+                (agent,)
+            )
+
+    def lookup(self, agent, model_name, prompt_version, inputs):
+        """
+        Look up a request and record the hit or miss.
+
+        Returns:
+            tuple: (key, value) where value is None on a miss.
+        """
+        key = self.make_key(agent, model_name, prompt_version, inputs)
+        value = self.get(key)
+        self._record(agent, value is not None)
+        return key, value
+
+    def get_or_compute(self, agent, model_name, prompt_version, inputs, compute, use_cache=True):
+        """
+        Return the cached response for a request, computing and storing it on a miss.
+
+        The prompt version is part of the key. Each agent keeps it in a
+        PROMPT_VERSION constant and bumps it whenever its prompt template (or the
+        shape of the cached value) changes, so stale responses are never reused.
+
+        Args:
+            agent (str): Name of the agent.
+            model_name (str): Gemini model name.
+            prompt_version (str): Version of the agent's prompt template.
+            inputs (dict): The request inputs that affect the response.
+            compute (callable): Produces the value when it is not cached.
+            use_cache (bool): If False, skip the lookup and refresh the stored value.
+
+        Returns:
+            tuple: (value, cached) where cached is True on a cache hit.
+        """
+        if use_cache:
+            key, value = self.lookup(agent, model_name, prompt_version, inputs)
+            if value is not None:
+                return value, True
+        else:
+            key = self.make_key(agent, model_name, prompt_version, inputs)
+
+        value = compute()
+        self.set(key, agent, value)
+        return value, False
+
+    def stats(self):
+        """
+        Returns hit/miss counts per agent plus overall size information.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT agent, hits, misses FROM stats ORDER BY agent").fetchall()
+            entries, total_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+
+        agents = {}
+        total_hits = 0
+        total_misses = 0
+        for agent, hits, misses in rows:
+            lookups = hits + misses
+            agents[agent] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / lookups if lookups else 0.0
+            }
+            total_hits += hits
+            total_misses += misses
+
+        total_lookups = total_hits + total_misses
+        return {
+            "agents": agents,
+            "hits": total_hits,
+            "misses": total_misses,
+            "hit_rate": total_hits / total_lookups if total_lookups else 0.0,
+            "entries": entries,
+            "total_bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "max_age_seconds": self.max_age_seconds
+        }
+
+    def clear(self):
+        """Remove all cached responses and reset statistics."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM stats")
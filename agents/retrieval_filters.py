@@ -0,0 +1,167 @@
+import re
+import operator
+
+import numpy as np
+
+# Metadata fields that scope filters can use, and how local indexes store them
+FILTER_FIELDS = {
+    "chapter_number": "number",
+    "page_number": "number",
+    "section_number": "text",
+    "subsection_number": "text",
+    "chapter": "text",
+    "section": "text",
+    "subsection": "text",
+}
+
+_CHAPTER_NUMBER = re.compile(r'^\s*(?:chapter\s+)?(\d+)\b', re.IGNORECASE)
+_SECTION_NUMBER = re.compile(r'^\s*(\d+(?:\.\d+)+)\b')
+
+_COMPARISONS = {
+    "$eq": operator.eq,
+    "$ne": operator.ne,
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+
+
+def chapter_number(value):
+    """Returns the number in "Chapter 3: ...", "3" or 3, or None."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    match = _CHAPTER_NUMBER.match(str(value or ""))
+    return int(match.group(1)) if match else None
+
+
+def section_number(value):
+    """Returns "1.2" for "1.2 Steam Power" or "1.2", or None."""
+    match = _SECTION_NUMBER.match(str(value or ""))
+    return match.group(1) if match else None
+
+
+def scope_metadata(chapter=None, section=None, subsection=None):
+    """
+    Numeric scope fields derived from the chapter/section headings of a chunk.
+
+    Chroma rejects None metadata values, so only the fields that could be parsed
+    are returned.
+    """
+    metadata = {
+        "chapter_number": chapter_number(chapter),
+        "section_number": section_number(section),
+        "subsection_number": section_number(subsection),
+    }
+    return {key: value for key, value in metadata.items() if value is not None}
+
+
+def build_where(chapter=None, section=None, subsection=None, page_start=None, page_end=None):
+    """
+    Build a Chroma `where` clause restricting retrieval to part of the book.
+
+    Numbers ("3", "Chapter 3", "1.2", "1.2.3") match the numeric fields added at
+    ingestion; other values must equal the stored heading exactly.
+
+    Args:
+        chapter (int or str): Chapter number or full chapter heading.
+        section (str): Section number ("1.2") or full section heading.
+        subsection (str): Subsection number ("1.2.3") or full subsection heading.
+        page_start (int): First page, inclusive.
+        page_end (int): Last page, inclusive.
+
+    Returns:
+        dict: The where clause, or None when no filter is given.
+    """
+    clauses = []
+    if chapter not in (None, ""):
+        number = chapter_number(chapter)
+        clauses.append({"chapter_number": number} if number is not None else {"chapter": str(chapter)})
+    for field, value in (("section", section), ("subsection", subsection)):
+        if value in (None, ""):
+            continue
+        number = section_number(value)
+        clauses.append({f"{field}_number": number} if number is not None else {field: str(value)})
+    for comparison, value in (("$gte", page_start), ("$lte", page_end)):
+        if value in (None, ""):
+            continue
+        try:
+            page = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid page number: {value!r}")
+        clauses.append({"page_number": {comparison: page}})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def parse_filters(filters):
+    """
+    Build a where clause from a request's "filters" object.
+
+    Raises:
+        ValueError: If the filters are not an object or contain unknown keys.
+    """
+    if not filters:
+        return None
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object")
+    allowed = {"chapter", "section", "subsection", "page_start", "page_end"}
+    unknown = sorted(set(filters) - allowed)
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(unknown)}")
+    return build_where(**filters)
+
+
+def metadata_columns(metadatas):
+    """
+    Store the filterable metadata fields as NumPy columns for local indexes.
+
+    Missing numbers become NaN and missing text becomes "", so they never match.
+    """
+    columns = {}
+    for field, kind in FILTER_FIELDS.items():
+        values = [(meta or {}).get(field) for meta in metadatas]
+        if kind == "number":
+            columns[field] = np.array([np.nan if v is None or v == "" else float(v) for v in values], dtype=np.float64)
+        else:
+            columns[field] = np.array(["" if v is None else str(v) for v in values])
+    return columns
+
+
+def where_mask(columns, where, count):
+    """
+    Evaluate a Chroma-style where clause against metadata columns.
+
+    Supports field equality, $eq/$ne/$gt/$gte/$lt/$lte/$in/$nin and $and/$or.
+
+    Args:
+        columns (dict): Field -> NumPy array, as built by metadata_columns.
+        where (dict): The where clause.
+        count (int): Number of rows.
+
+    Returns:
+        np.ndarray: Boolean mask of matching rows.
+    """
+    mask = np.ones(count, dtype=bool)
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            masks = [where_mask(columns, clause, count) for clause in condition]
+            combined = np.logical_and.reduce(masks) if key == "$and" else np.logical_or.reduce(masks)
+            mask &= combined
+            continue
+        if key not in columns:
+            raise ValueError(f"Metadata field '{key}' cannot be filtered on in a local index")
+        column = np.asarray(columns[key])
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for comparison, value in condition.items():
+            if comparison in ("$in", "$nin"):
+                matched = np.isin(column, list(value))
+                mask &= matched if comparison == "$in" else ~matched
+            elif comparison in _COMPARISONS:
+                mask &= _COMPARISONS[comparison](column, value)
+            else:
+                raise ValueError(f"Unsupported where operator: {comparison}")
+    return mask
@@ -0,0 +1,60 @@
+import numpy as np
+
+from agents.quantized_index import normalize_rows
+
+
+class CentroidShardRouter:
+    def __init__(self, centroids, margin=0.05, max_shards=None):
+        """
+        Route queries to the shards whose mean embedding is closest to the query.
+
+        Each shard (one collection per book or subject) is summarized by the
+        normalized mean of its chunk embeddings, so routing costs one small
+        dot product per shard. A query goes to the best-scoring shard plus every
+        shard scoring within `margin` of it, which keeps cross-subject questions
+        searching more than one shard.
+
+        Args:
+            centroids (dict): Shard name -> mean embedding.
+            margin (float): Cosine similarity below the best shard still searched.
+            max_shards (int): Upper bound on shards searched per query (None for no bound).
+        """
+        self.names = list(centroids)
+        self.centroids = normalize_rows(np.stack([np.asarray(centroids[name], dtype=np.float32)
+                                                  for name in self.names]))
+        self.margin = margin
+        self.max_shards = max_shards
+
+    @classmethod
+    def from_collections(cls, collections, sample_size=2000, **kwargs):
+        """
+        Compute each shard's centroid from a sample of its stored embeddings.
+
+        Args:
+            collections (dict): Shard name -> chromadb.Collection.
+            sample_size (int): Embeddings read per collection.
+        """
+        centroids = {}
+        for name, collection in collections.items():
+            batch = collection.get(limit=sample_size, include=["embeddings"])
+            if len(batch["embeddings"]):
+                centroids[name] = normalize_rows(batch["embeddings"]).mean(axis=0)
+        return cls(centroids, **kwargs)
+
+    def scores(self, query_embedding):
+        """Returns {shard name: cosine similarity to the shard centroid}."""
+        query = normalize_rows(query_embedding)[0]
+        return dict(zip(self.names, (self.centroids @ query).tolist()))
+
+    def route(self, query_embedding):
+        """
+        Pick the shards to search for a query.
+
+        Returns:
+            list: Shard names, best match first.
+        """
+        scores = self.scores(query_embedding)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        best = scores[ranked[0]]
+        selected = [name for name in ranked if scores[name] >= best - self.margin]
+        return selected[:self.max_shards] if self.max_shards else selected
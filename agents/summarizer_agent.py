@@ -1,25 +1,47 @@
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.text_utils import split_into_segments
+from agents.extractive_summary import extract_salient_sentences
+from agents.metrics import generate_content
 
 # Load environment variables
 load_dotenv()
 
 class SummarizerAgent:
-    def __init__(self, model_name="gemini-1.5-flash"):
+    # Part of the response cache key (see ResponseCache.get_or_compute)
+    PROMPT_VERSION = "2"
+
+    def __init__(self, model_name="gemini-1.5-flash", cache=None, embedding_function=None,
+                 map_reduce_threshold_chars=12000, chunk_max_chars=6000, max_workers=4):
         """
         Initialize the SummarizerAgent.
 
         Args:
             model_name (str): Gemini model name.
+            cache (ResponseCache): Optional shared response cache.
+            embedding_function (callable): Optional sentence embedding function used to
+                pre-select salient sentences for short summaries.
+            map_reduce_threshold_chars (int): Inputs longer than this are summarized
+                hierarchically when mode is "auto".
+            chunk_max_chars (int): Maximum chunk size for the map phase.
+            max_workers (int): Maximum number of chunks summarized concurrently.
         """
         google_api_key = os.getenv("GOOGLE_API_KEY")
         if not google_api_key:
             raise ValueError("GOOGLE_API_KEY environment variable not set")
         genai.configure(api_key=google_api_key)
 
+        self.model_name = model_name
         self.model = genai.GenerativeModel(model_name)
-        
+        self.cache = cache
+        self.embedding_function = embedding_function
+        self.map_reduce_threshold_chars = map_reduce_threshold_chars
+        self.chunk_max_chars = chunk_max_chars
+        self.max_workers = max_workers
+
         # Summary length options
         self.length_options = {
             "brief": "1-2 sentences",
@@ -28,46 +50,201 @@ class SummarizerAgent:
             "detailed": "comprehensive summary with key points"
         }
 
+        # Short summaries only need the most salient sentences, so longer inputs are
+        # condensed locally before the Gemini call: (character budget, sentences for
+        # the extractive-only fast path)
+        self.extractive_budgets = {
+            "brief": (1500, 2),
+            "short": (3000, 5)
+        }
+
     def get_length_options(self):
         """
         Returns a dictionary of available summary length options.
         """
         return self.length_options
 
-    def summarize(self, text, length="medium"):
+    def _summarize_single(self, text, length_desc):
+        """Summarize text with a single Gemini call."""
+        prompt = f"""
+Summarize the following text in {length_desc}.
+Focus on the main ideas, key points, and important details.
+Maintain the factual accuracy and original meaning of the content.
+
+Text to summarize:
+{text}
+
+Summary:
+"""
+
+        response = generate_content("summarizer", self.model, prompt)
+        return response.text.strip()
+
+    def _summarize_chunk(self, chunk, use_cache=True):
+        """
+        Map step: summarize one chunk into its key points.
+
+        The result does not depend on the requested length, so it is cached on
+        its own and re-summarizing at a different length skips this step.
+        """
+        def generate():
+            prompt = f"""
+The following text is one part of a longer document.
+Summarize this part in a few concise paragraphs, keeping every main idea, key point, important name, date and figure.
+Maintain the factual accuracy and original meaning of the content.
+
+Text:
+{chunk}
+
+Summary of this part:
+"""
+            response = generate_content("summarizer", self.model, prompt)
+            return response.text.strip()
+
+        if self.cache:
+            summary, _ = self.cache.get_or_compute(
+                "summarizer_map",
+                self.model_name,
+                self.PROMPT_VERSION,
+                {"chunk": chunk},
+                generate,
+                use_cache=use_cache
+            )
+            return summary
+        return generate()
+
+    def _summarize_map_reduce(self, text, length_desc, use_cache=True):
+        """
+        Summarize a long text hierarchically.
+
+        Returns:
+            tuple: (summary, number_of_chunks_in_the_first_map_pass)
+        """
+        first_pass_chunks = None
+        levels = 0
+        # Always map once; repeat (up to three levels) while the partials are still too long
+        while first_pass_chunks is None or (len(text) > self.map_reduce_threshold_chars and levels < 3):
+            levels += 1
+            chunks = [chunk for chunk, _ in split_into_segments(text, self.chunk_max_chars) if chunk.strip()]
+            if first_pass_chunks is None:
+                first_pass_chunks = len(chunks)
+            if not chunks:
+                return "", 0
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+                partials = list(executor.map(lambda chunk: self._summarize_chunk(chunk, use_cache), chunks))
+            text = "\n\n".join(partials)
+
+        prompt = f"""
+The following are summaries of consecutive parts of one document, in order.
+Combine them into a single summary of the whole document in {length_desc}.
+Focus on the main ideas, key points, and important details, and avoid repetition.
+Maintain the factual accuracy and original meaning of the content.
+
+Partial summaries:
+{text}
+
+Summary:
+"""
+
+        response = generate_content("summarizer", self.model, prompt)
+        return response.text.strip(), first_pass_chunks
+
+    def summarize(self, text, length="medium", use_cache=True, mode="auto", extractive_only=False):
         """
         Summarizes the given text according to the specified length.
 
         Args:
             text (str): The text to summarize.
             length (str): The desired summary length (brief, short, medium, detailed).
+            use_cache (bool): Whether to serve the summary from the response cache.
+            mode (str): "single" sends the whole text in one prompt, "map_reduce"
+                summarizes chunks concurrently and then combines them, and "auto"
+                picks "map_reduce" for inputs longer than map_reduce_threshold_chars.
+            extractive_only (bool): Return the most salient sentences directly without
+                calling Gemini. Only for brief and short summaries, and only when an
+                embedding function is configured; otherwise an error is returned.
 
         Returns:
             dict: Dictionary containing the summarized text and metadata.
         """
-        if not text:
+        if not text or not text.strip():
             return {"error": "No text provided"}
-            
+        if mode not in ("auto", "single", "map_reduce"):
+            return {"error": f"Unsupported mode: {mode}"}
+
         # Get the length description
         length_desc = self.length_options.get(length, self.length_options["medium"])
-            
-        prompt = f"""
-Summarize the following text in {length_desc}.
-Focus on the main ideas, key points, and important details.
-Maintain the factual accuracy and original meaning of the content.
 
-Text to summarize:
-{text}
+        budget = self.extractive_budgets.get(length)
+        if extractive_only:
+            if not budget:
+                return {"error": "extractive_only is only available for brief and short summaries"}
+            if not self.embedding_function:
+                return {"error": "extractive_only requires an embedding model"}
+            max_chars, max_sentences = budget
+            extractive = extract_salient_sentences(text, self.embedding_function, max_sentences=max_sentences)
+            return {
+                "original": text,
+                "summary": extractive["text"],
+                "length": length,
+                "length_description": length_desc,
+                "mode": "extractive",
+                "cached": False,
+                "extractive": {
+                    "sentences_total": extractive["sentences_total"],
+                    "sentences_selected": extractive["sentences_selected"]
+                }
+            }
+        prepass = bool(budget and self.embedding_function)
 
-Summary:
-"""
+        def generate():
+            # The extractive pre-pass embeds the whole text, so it only runs on a cache miss
+            source = text
+            extractive = None
+            if prepass and len(text) > budget[0]:
+                extractive = extract_salient_sentences(text, self.embedding_function, max_chars=budget[0])
+                source = extractive["text"]
+
+            resolved_mode = mode
+            if resolved_mode == "auto":
+                resolved_mode = "map_reduce" if len(source) > self.map_reduce_threshold_chars else "single"
 
-        response = self.model.generate_content(prompt)
-        summary = response.text.strip()
-        
-        return {
+            value = {"mode": resolved_mode}
+            if resolved_mode == "map_reduce":
+                value["summary"], value["chunks"] = self._summarize_map_reduce(source, length_desc, use_cache)
+            else:
+                value["summary"] = self._summarize_single(source, length_desc)
+            if extractive:
+                value["extractive"] = {
+                    "input_chars": len(text),
+                    "selected_chars": len(source),
+                    "sentences_total": extractive["sentences_total"],
+                    "sentences_selected": extractive["sentences_selected"]
+                }
+            return value
+
+        cached = False
+        if self.cache:
+            value, cached = self.cache.get_or_compute(
+                "summarizer",
+                self.model_name,
+                self.PROMPT_VERSION,
+                {"text": text, "length_description": length_desc, "mode": mode, "extractive_prepass": prepass},
+                generate,
+                use_cache=use_cache
+            )
+        else:
+            value = generate()
+
+        result = {
             "original": text,
-            "summary": summary,
+            "summary": value["summary"],
             "length": length,
-            "length_description": length_desc
-        }
\ No newline at end of file
+            "length_description": length_desc,
+            "mode": value["mode"],
+            "cached": cached
+        }
+        for key in ("chunks", "extractive"):
+            if key in value:
+                result[key] = value[key]
+        return result
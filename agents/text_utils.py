@@ -0,0 +1,167 @@
+import re
+
+# Blank lines separate paragraphs; the separator is kept so formatting survives reassembly
+PARAGRAPH_SPLIT_PATTERN = re.compile(r'(\n[ \t]*\n\s*)')
+
+# Sentence ends, including the Devanagari danda and full-width CJK punctuation
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?<=[.!?।。！？])(\s+)')
+
+
+def _split_keep_separators(text, pattern):
+    """
+    Split text with a capturing pattern into (body, separator) pairs.
+
+    Joining every body and separator in order reproduces the input exactly.
+    """
+    parts = pattern.split(text)
+    units = []
+    for i in range(0, len(parts), 2):
+        body = parts[i]
+        separator = parts[i + 1] if i + 1 < len(parts) else ""
+        units.append((body, separator))
+
+    # Move trailing whitespace of the last body into its separator
+    body, separator = units[-1]
+    stripped = body.rstrip()
+    units[-1] = (stripped, body[len(stripped):] + separator)
+
+    # A text ending in a separator leaves an empty final body; fold it into the previous unit
+    if len(units) > 1 and not units[-1][0]:
+        body, separator = units.pop()
+        prev_body, prev_separator = units[-1]
+        units[-1] = (prev_body, prev_separator + separator)
+    return units
+
+
+def _hard_split(body, separator, max_chars):
+    """Split an over-long sentence at word boundaries (or mid-word as a last resort)."""
+    pieces = []
+    while len(body) > max_chars:
+        cut = body.rfind(" ", 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars
+        rest = body[cut:]
+        stripped = rest.lstrip()
+        pieces.append((body[:cut], rest[:len(rest) - len(stripped)]))
+        body = stripped
+    pieces.append((body, separator))
+    return pieces
+
+
+def split_sentences(text):
+    """
+    Split text into sentence units, keeping paragraph breaks as separators.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        list: (sentence, trailing_whitespace) pairs. Joining them reproduces the text.
+    """
+    leading = text[:len(text) - len(text.lstrip())]
+    units = [("", leading)] if leading else []
+    for paragraph, paragraph_sep in _split_keep_separators(text.lstrip(), PARAGRAPH_SPLIT_PATTERN):
+        sentences = _split_keep_separators(paragraph, SENTENCE_SPLIT_PATTERN)
+        body, separator = sentences[-1]
+        sentences[-1] = (body, separator + paragraph_sep)
+        units.extend(sentences)
+    return units
+
+
+def split_into_segments(text, max_chars):
+    """
+    Split text into segments under a size budget at paragraph or sentence boundaries.
+
+    Paragraphs are packed together while they fit; paragraphs larger than the
+    budget are split into sentences, and sentences larger than the budget are
+    split at word boundaries.
+
+    Args:
+        text (str): The text to split.
+        max_chars (int): Maximum number of characters per segment.
+
+    Returns:
+        list: (segment, trailing_whitespace) pairs. Joining them reproduces the text.
+    """
+    leading = text[:len(text) - len(text.lstrip())]
+    units = []
+    for paragraph, paragraph_sep in _split_keep_separators(text.lstrip(), PARAGRAPH_SPLIT_PATTERN):
+        if len(paragraph) <= max_chars:
+            units.append((paragraph, paragraph_sep))
+            continue
+        sentences = _split_keep_separators(paragraph, SENTENCE_SPLIT_PATTERN)
+        body, separator = sentences[-1]
+        sentences[-1] = (body, separator + paragraph_sep)
+        for sentence, sentence_sep in sentences:
+            if len(sentence) <= max_chars:
+                units.append((sentence, sentence_sep))
+            else:
+                units.extend(_hard_split(sentence, sentence_sep, max_chars))
+
+    segments = [("", leading)] if leading else []
+    current = None
+    current_sep = ""
+    for body, separator in units:
+        if current is None:
+            current, current_sep = body, separator
+        elif len(current) + len(current_sep) + len(body) > max_chars:
+            segments.append((current, current_sep))
+            current, current_sep = body, separator
+        else:
+            current += current_sep + body
+            current_sep = separator
+    if current or current_sep:
+        segments.append((current, current_sep))
+    return segments
+
+
+def overlap_length(previous, following, min_overlap=20):
+    """
+    Length of the longest suffix of `previous` that is also a prefix of `following`.
+
+    Overlapping chunks from a text splitter repeat the end of one chunk at the
+    start of the next. Matches shorter than min_overlap are treated as chance
+    and ignored.
+
+    Args:
+        previous (str): The earlier chunk.
+        following (str): The chunk after it.
+        min_overlap (int): Shortest overlap accepted.
+
+    Returns:
+        int: Number of overlapping characters, or 0.
+    """
+    if min(len(previous), len(following)) < min_overlap:
+        return 0
+    probe = following[:min_overlap]
+    # The earliest occurrence of the probe that reaches the end of `previous` is the longest overlap
+    start = previous.find(probe, max(0, len(previous) - len(following)))
+    while start != -1:
+        if following.startswith(previous[start:]):
+            return len(previous) - start
+        start = previous.find(probe, start + 1)
+    return 0
+
+
+def stitch_chunks(chunks, separator="\n\n", min_overlap=20):
+    """
+    Join consecutive chunks of one text, writing each overlap only once.
+
+    Chunks without a detectable overlap are joined with `separator`, which is
+    where the splitter cut between paragraphs.
+
+    Args:
+        chunks (list): Chunk texts in their original order.
+        separator (str): Joiner for chunks that do not overlap.
+        min_overlap (int): Shortest overlap accepted.
+
+    Returns:
+        str: The stitched text.
+    """
+    if not chunks:
+        return ""
+    text = chunks[0]
+    for chunk in chunks[1:]:
+        overlap = overlap_length(text, chunk, min_overlap)
+        text += chunk[overlap:] if overlap else separator + chunk
+    return text
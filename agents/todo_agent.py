@@ -1,17 +1,129 @@
 import os
+import json
 import uuid
+import base64
+import sqlite3
 from datetime import datetime
+from contextlib import contextmanager
+
+# Numeric rank so priority can be sorted and indexed
+PRIORITY_RANKS = {"low": 1, "medium": 2, "high": 3}
+
+# Whitelisted sort keys -> SQL expression (undated tasks sort after dated ones)
+SORT_EXPRESSIONS = {
+    "created_at": "created_at",
+    "due_date": "COALESCE(due_date, '9999-12-31')",
+    "priority": "priority_rank"
+}
+
+TASK_COLUMNS = "id, description, due_date, priority, completed, created_at, completed_at"
+
+MAX_BATCH_OPERATIONS = 500
+
 
 class TodoAgent:
-    def __init__(self):
+    def __init__(self, db_path="processed_data/todo.sqlite3", tombstone_retention=1000):
         """
         Initialize the TodoAgent.
-        
-        This is a simple in-memory implementation.
-        In a production app, you'd use a database.
+
+        Tasks are stored in a SQLite file so they survive restarts and can be
+        shared between worker processes. Filters, sorting and pagination are
+        pushed down into indexed queries.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+            tombstone_retention (int): Number of versions a deletion tombstone is kept
+                for delta sync; clients that synced before a purged tombstone must
+                reload the full list.
+        """
+        self.db_path = db_path
+        self.tombstone_retention = tombstone_retention
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id TEXT PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    due_date TEXT,
+                    priority TEXT NOT NULL,
+                    priority_rank INTEGER NOT NULL,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    completed_at TEXT,
+                    -- Change tracking for delta sync; deletes leave a tombstone row behind
+                    created_version INTEGER NOT NULL DEFAULT 0,
+                    updated_version INTEGER NOT NULL DEFAULT 0,
+                    deleted INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS store_meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            conn.execute("INSERT OR IGNORE INTO store_meta (key, value) VALUES ('version', 0)")
+            # Newest version whose tombstones may have been purged
+            conn.execute("INSERT OR IGNORE INTO store_meta (key, value) VALUES ('purged_version', 0)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_updated_version ON tasks(updated_version)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tasks_tombstones ON tasks(updated_version) WHERE deleted = 1"
+            )
+            # The default listing (all tasks by creation time) needs an index that does not lead with completed
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks(created_at, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed, created_at, id)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tasks_due_date "
+                "ON tasks(COALESCE(due_date, '9999-12-31'), id)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority_rank, id)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_task(row):
+        return {
+            "id": row[0],
+            "description": row[1],
+            "due_date": row[2],
+            "priority": row[3],
+            "completed": bool(row[4]),
+            "created_at": row[5],
+            "completed_at": row[6]
+        }
+
+    def _get_task(self, conn, task_id):
+        row = conn.execute(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = ? AND deleted = 0", (task_id,)
+        ).fetchone()
+        return self._row_to_task(row) if row else None
+
+    @staticmethod
+    def _next_version(conn):
+        # The increment takes SQLite's write lock, so versions are unique across processes
+        conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'version'")
+        return conn.execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0]
+
+    def get_version(self):
+        """
+        Returns the current change version of the store.
+
+        The version increases with every add, update and delete.
         """
-        # Dictionary to store tasks
-        self.tasks = {}
+        with self._connect() as conn:
+            return conn.execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0]
 
     def add_task(self, task_description, due_date=None, priority="medium"):
         """
@@ -25,31 +137,38 @@ class TodoAgent:
         Returns:
             dict: The created task object.
         """
+        with self._connect() as conn:
+            return self._add_task(conn, task_description, due_date, priority)
+
+    def _add_task(self, conn, task_description, due_date=None, priority="medium", version=None):
         if not task_description:
             return {"error": "Task description is required"}
-            
+
         # Validate priority
-        if priority not in ["low", "medium", "high"]:
+        if priority not in PRIORITY_RANKS:
             priority = "medium"
-            
-        # Create task ID
-        task_id = str(uuid.uuid4())
-        created_date = datetime.now().isoformat()
-        
+
         # Create task object
         task = {
-            "id": task_id,
+            "id": str(uuid.uuid4()),
             "description": task_description,
-            "due_date": due_date,
+            "due_date": due_date or None,
             "priority": priority,
             "completed": False,
-            "created_at": created_date,
+            "created_at": datetime.now().isoformat(),
             "completed_at": None
         }
-        
-        # Add to tasks dictionary
-        self.tasks[task_id] = task
-        
+
+        if version is None:
+            version = self._next_version(conn)
+        conn.execute(
+            "INSERT INTO tasks (id, description, due_date, priority, priority_rank, completed, created_at, "
+            "completed_at, created_version, updated_version) "
+            "VALUES (?, ?, ?, ?, ?, 0, ?, NULL, ?, ?)",
+            (task["id"], task["description"], task["due_date"], priority,
+             PRIORITY_RANKS[priority], task["created_at"], version, version)
+        )
+
         return task
 
     def get_tasks(self, include_completed=True):
@@ -62,10 +181,151 @@ class TodoAgent:
         Returns:
             list: List of task objects.
         """
-        if include_completed:
-            return list(self.tasks.values())
-        else:
-            return [task for task in self.tasks.values() if not task["completed"]]
+        query = f"SELECT {TASK_COLUMNS} FROM tasks WHERE deleted = 0"
+        if not include_completed:
+            query += " AND completed = 0"
+        query += " ORDER BY created_at, id"
+        with self._connect() as conn:
+            return [self._row_to_task(row) for row in conn.execute(query)]
+
+    @staticmethod
+    def _encode_cursor(sort_value, task_id):
+        raw = json.dumps([sort_value, task_id]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        try:
+            sort_value, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, TypeError):
+            return None
+        return sort_value, task_id
+
+    def query_tasks(self, status="all", priority=None, due_before=None, due_after=None,
+                    sort_by="created_at", order="asc", limit=50, cursor=None):
+        """
+        Get a page of tasks with filters and sorting applied in the database.
+
+        Args:
+            status (str): "all", "active" or "completed".
+            priority (str): Only return tasks with this priority (low, medium, high).
+            due_before (str): Only return tasks due on or before this date.
+            due_after (str): Only return tasks due on or after this date.
+            sort_by (str): "created_at", "due_date" or "priority".
+            order (str): "asc" or "desc".
+            limit (int): Maximum number of tasks to return.
+            cursor (str): Opaque cursor from a previous page's "next_cursor".
+
+        Returns:
+            dict: The page of tasks and the cursor for the next page (None on the last page).
+        """
+        if status not in ("all", "active", "completed"):
+            return {"error": f"Invalid status: {status}"}
+        if sort_by not in SORT_EXPRESSIONS:
+            return {"error": f"Invalid sort field: {sort_by}"}
+        if order not in ("asc", "desc"):
+            return {"error": f"Invalid sort order: {order}"}
+        if priority is not None and priority not in PRIORITY_RANKS:
+            return {"error": f"Invalid priority: {priority}"}
+
+        sort_expression = SORT_EXPRESSIONS[sort_by]
+        conditions = ["deleted = 0"]
+        params = []
+
+        if status == "active":
+            conditions.append("completed = 0")
+        elif status == "completed":
+            conditions.append("completed = 1")
+        if priority:
+            conditions.append("priority_rank = ?")
+            params.append(PRIORITY_RANKS[priority])
+        # Compare on the indexed expression so the due-date index can range-seek
+        if due_before:
+            conditions.append(f"{SORT_EXPRESSIONS['due_date']} <= ? AND due_date IS NOT NULL")
+            params.append(due_before)
+        if due_after:
+            conditions.append(f"{SORT_EXPRESSIONS['due_date']} >= ? AND due_date IS NOT NULL")
+            params.append(due_after)
+
+        # Keyset pagination: continue strictly after the last (sort value, id) seen
+        if cursor:
+            decoded = self._decode_cursor(cursor)
+            if decoded is None:
+                return {"error": "Invalid cursor"}
+            comparison = ">" if order == "asc" else "<"
+            conditions.append(
+                f"({sort_expression} {comparison} ? OR ({sort_expression} = ? AND id {comparison} ?))"
+            )
+            params.extend([decoded[0], decoded[0], decoded[1]])
+
+        query = f"SELECT {TASK_COLUMNS}, {sort_expression} FROM tasks WHERE " + " AND ".join(conditions)
+        direction = "ASC" if order == "asc" else "DESC"
+        query += f" ORDER BY {sort_expression} {direction}, id {direction} LIMIT ?"
+        limit = max(1, min(int(limit), 500))
+        # Fetch one extra row to know whether another page exists
+        params.append(limit + 1)
+
+        with self._connect() as conn:
+            # Read the version first: if a write lands in between, the client only re-syncs it
+            version = conn.execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0]
+            rows = conn.execute(query, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(rows[-1][-1], rows[-1][0])
+
+        return {
+            "todos": [self._row_to_task(row) for row in rows],
+            "next_cursor": next_cursor,
+            "version": version
+        }
+
+    def get_changes(self, since):
+        """
+        Get the tasks created, updated and deleted after a given version.
+
+        Args:
+            since (int): Version the client last synced to.
+
+        Returns:
+            dict: The current version plus created tasks, updated tasks and deleted task IDs,
+                or the current version and "resync_required" when deletions after `since`
+                may have been purged and the client must reload the full list.
+        """
+        with self._connect() as conn:
+            version = conn.execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0]
+            purged_version = conn.execute(
+                "SELECT value FROM store_meta WHERE key = 'purged_version'"
+            ).fetchone()[0]
+            if since < purged_version:
+                return {"version": version, "resync_required": True}
+            rows = conn.execute(
+                f"SELECT {TASK_COLUMNS}, created_version, deleted FROM tasks "
+                f"WHERE updated_version > ? ORDER BY updated_version",
+                (since,)
+            ).fetchall()
+
+        created = []
+        updated = []
+        deleted = []
+        for row in rows:
+            created_version, is_deleted = row[-2], row[-1]
+            if is_deleted:
+                # Tasks created and deleted since the last sync were never seen by the client
+                if created_version <= since:
+                    deleted.append(row[0])
+            elif created_version > since:
+                created.append(self._row_to_task(row))
+            else:
+                updated.append(self._row_to_task(row))
+
+        return {
+            "version": version,
+            "created": created,
+            "updated": updated,
+            "deleted": deleted
+        }
 
     def update_task(self, task_id, completed=None):
         """
@@ -78,19 +338,26 @@ class TodoAgent:
         Returns:
             dict: The updated task object or error.
         """
-        if task_id not in self.tasks:
+        with self._connect() as conn:
+            return self._update_task(conn, task_id, completed)
+
+    def _update_task(self, conn, task_id, completed=None, version=None):
+        task = self._get_task(conn, task_id)
+        if task is None:
             return {"error": f"Task with ID {task_id} not found"}
-            
-        task = self.tasks[task_id]
-        
+
         # Update completion status if provided
         if completed is not None:
-            task["completed"] = completed
-            if completed:
-                task["completed_at"] = datetime.now().isoformat()
-            else:
-                task["completed_at"] = None
-        
+            completed_at = datetime.now().isoformat() if completed else None
+            if version is None:
+                version = self._next_version(conn)
+            conn.execute(
+                "UPDATE tasks SET completed = ?, completed_at = ?, updated_version = ? WHERE id = ?",
+                (1 if completed else 0, completed_at, version, task_id)
+            )
+            task["completed"] = bool(completed)
+            task["completed_at"] = completed_at
+
         return task
 
     def delete_task(self, task_id):
@@ -103,10 +370,99 @@ class TodoAgent:
         Returns:
             dict: Success message or error.
         """
-        if task_id not in self.tasks:
+        with self._connect() as conn:
+            return self._delete_task(conn, task_id)
+
+    def _delete_task(self, conn, task_id, version=None):
+        if self._get_task(conn, task_id) is None:
             return {"error": f"Task with ID {task_id} not found"}
-            
-        # Remove the task
-        del self.tasks[task_id]
-        
-        return {"success": True, "message": f"Task {task_id} deleted successfully"}
\ No newline at end of file
+
+        # Keep a tombstone so delta sync can report the deletion
+        if version is None:
+            version = self._next_version(conn)
+        conn.execute(
+            "UPDATE tasks SET deleted = 1, updated_version = ? WHERE id = ?",
+            (version, task_id)
+        )
+        self._purge_tombstones(conn, version)
+
+        return {"success": True, "message": f"Task {task_id} deleted successfully"}
+
+    def _purge_tombstones(self, conn, version):
+        """Remove tombstones older than the retention window and remember the newest one removed."""
+        cutoff = version - self.tombstone_retention
+        newest = conn.execute(
+            "SELECT MAX(updated_version) FROM tasks WHERE deleted = 1 AND updated_version <= ?", (cutoff,)
+        ).fetchone()[0]
+        if newest is None:
+            return
+        conn.execute("DELETE FROM tasks WHERE deleted = 1 AND updated_version <= ?", (cutoff,))
+        conn.execute(
+            "UPDATE store_meta SET value = MAX(value, ?) WHERE key = 'purged_version'", (newest,)
+        )
+
+    def apply_batch(self, operations):
+        """
+        Apply a list of add, update and delete operations atomically.
+
+        Every operation shares one change version. If any operation fails, the
+        whole batch is rolled back and nothing is applied.
+
+        Args:
+            operations (list): Operation dicts, each with an "op" of:
+                "add" (with "task", optional "due_date" and "priority"),
+                "update" (with "id" and "completed") or
+                "delete" (with "id").
+
+        Returns:
+            dict: Overall success, the resulting store version and one result per operation.
+        """
+        if not isinstance(operations, list) or not operations:
+            return {"error": "Operations must be a non-empty list"}
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return {"error": f"A batch may contain at most {MAX_BATCH_OPERATIONS} operations"}
+
+        results = []
+        failed_index = None
+        with self._connect() as conn:
+            version = self._next_version(conn)
+            for i, operation in enumerate(operations):
+                op = operation.get("op") if isinstance(operation, dict) else None
+                if op == "add":
+                    result = self._add_task(
+                        conn,
+                        operation.get("task", ""),
+                        operation.get("due_date"),
+                        operation.get("priority", "medium"),
+                        version=version
+                    )
+                elif op == "update":
+                    result = self._update_task(conn, operation.get("id", ""), operation.get("completed"), version=version)
+                elif op == "delete":
+                    result = self._delete_task(conn, operation.get("id", ""), version=version)
+                else:
+                    result = {"error": f"Unknown operation: {op}"}
+
+                if "error" in result:
+                    results.append({"index": i, "op": op, "ok": False, "error": result["error"]})
+                    failed_index = i
+                    break
+                results.append({"index": i, "op": op, "ok": True, "result": result})
+
+            if failed_index is not None:
+                conn.rollback()
+                version = conn.execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0]
+
+        if failed_index is not None:
+            return {
+                "success": False,
+                "error": f"Operation {failed_index} failed; the batch was rolled back",
+                "version": version,
+                "results": results
+            }
+
+        return {
+            "success": True,
+            "version": version,
+            "results": results
+        }
@@ -0,0 +1,123 @@
+import os
+import time
+import sqlite3
+import hashlib
+import unicodedata
+from contextlib import contextmanager
+
+
+class TranslationMemory:
+    def __init__(self, db_path):
+        """
+        Initialize the TranslationMemory.
+
+        Sentence translations are stored in a SQLite file keyed by the normalized
+        source sentence and target language, so repeated sentences across lessons
+        are translated only once.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+        """
+        self.db_path = db_path
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS memory (
+                    source_hash TEXT NOT NULL,
+                    target_language TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    use_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (source_hash, target_language)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def normalize(sentence):
+        """Normalize a sentence for lookup (Unicode NFC, collapsed whitespace)."""
+        return unicodedata.normalize("NFC", " ".join(sentence.split()))
+
+    @classmethod
+    def _hash(cls, sentence):
+        return hashlib.sha256(cls.normalize(sentence).encode("utf-8")).hexdigest()
+
+    def lookup(self, sentences, target_language):
+        """
+        Look up translations for several sentences at once.
+
+        Args:
+            sentences (list): Source sentences.
+            target_language (str): Target language code.
+
+        Returns:
+            dict: Normalized source sentence -> translation for every exact match.
+        """
+        if not sentences:
+            return {}
+        hashes = {self._hash(s): self.normalize(s) for s in sentences}
+        placeholders = ",".join("?" * len(hashes))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT source_hash, translation FROM memory "
+                f"WHERE target_language = ? AND source_hash IN ({placeholders})",
+                [target_language, *hashes.keys()]
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE memory SET use_count = use_count + 1 "
+                    "WHERE source_hash = ? AND target_language = ?",
+                    [(source_hash, target_language) for source_hash, _ in rows]
+                )
+        return {hashes[source_hash]: translation for source_hash, translation in rows}
+
+    def store(self, pairs, target_language):
+        """
+        Store sentence translations.
+
+        Args:
+            pairs (list): (source_sentence, translation) tuples.
+            target_language (str): Target language code.
+        """
+        now = time.time()
+        rows = [
+            (self._hash(source), target_language, self.normalize(source), translation, now)
+            for source, translation in pairs
+            if source.strip() and translation.strip()
+        ]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO memory (source_hash, target_language, source, translation, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def stats(self):
+        """
+        Returns the number of stored sentences per target language.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT target_language, COUNT(*), COALESCE(SUM(use_count), 0) "
+                "FROM memory GROUP BY target_language ORDER BY target_language"
+            ).fetchall()
+        return {
+            language: {"sentences": count, "reuses": reuses}
+            for language, count, reuses in rows
+        }
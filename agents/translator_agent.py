@@ -1,24 +1,42 @@
 import os
+import re
+import json
 from dotenv import load_dotenv
 import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from agents.text_utils import split_into_segments, split_sentences
+from agents.metrics import generate_content, record_error
 
 # Load environment variables
 load_dotenv()
 
 class TranslatorAgent:
-    def __init__(self, model_name="gemini-1.5-flash"):
+    # Part of the response cache key (see ResponseCache.get_or_compute)
+    PROMPT_VERSION = "1"
+
+    def __init__(self, model_name="gemini-1.5-flash", cache=None, memory=None, segment_max_chars=1500, max_workers=4):
         """
         Initialize the TranslatorAgent.
 
         Args:
             model_name (str): Gemini model name.
+            cache (ResponseCache): Optional shared response cache.
+            memory (TranslationMemory): Optional sentence-level translation memory.
+            segment_max_chars (int): Long texts are split into segments of at most this size.
+            max_workers (int): Maximum number of segments translated concurrently.
         """
         google_api_key = os.getenv("GOOGLE_API_KEY")
         if not google_api_key:
             raise ValueError("GOOGLE_API_KEY environment variable not set")
         genai.configure(api_key=google_api_key)
 
+        self.model_name = model_name
         self.model = genai.GenerativeModel(model_name)
+        self.cache = cache
+        self.memory = memory
+        self.segment_max_chars = segment_max_chars
+        self.max_workers = max_workers
         
         # Dictionary of supported languages
         self.languages = {
@@ -45,40 +63,376 @@ class TranslatorAgent:
         """
         return self.languages
 
-    def translate(self, text, target_language="en"):
+    def _validate(self, text, target_language):
+        """Returns (language_name, error) for a translation request."""
+        if not text:
+            return None, "No text provided"
+
+        # Get the language name
+        language_name = self.languages.get(target_language, "Unknown")
+        if language_name == "Unknown":
+            return None, f"Unsupported language code: {target_language}"
+        return language_name, None
+
+    def _generate_translation(self, text, language_name):
+        """Translate a block of text with one Gemini call."""
+        prompt = f"""
+Translate the following text into {language_name}. Use only that language, except for proper nouns or names, which should remain in English. Preserve meaning, tone, and formatting. Adapt cultural references or idioms as needed.
+
+Text:
+{text}
+
+Translation ({language_name}):
+"""
+
+        response = generate_content("translator", self.model, prompt)
+        return response.text.strip()
+
+    def _generate_sentence_translations(self, sentences, language_name):
+        """
+        Translate a list of sentences with one Gemini call.
+
+        Returns:
+            list: One translation per sentence, or None if the response could not be aligned.
+        """
+        prompt = f"""
+Translate each sentence in the following JSON array into {language_name}. Use only that language, except for proper nouns or names, which should remain in English. Preserve meaning and tone. Adapt cultural references or idioms as needed.
+
+Return only a JSON array of strings with exactly {len(sentences)} items, one translation per input sentence, in the same order.
+
+Sentences:
+{json.dumps(sentences, ensure_ascii=False)}
+"""
+
+        response = generate_content(
+            "translator",
+            self.model,
+            prompt,
+            generation_config={"response_mime_type": "application/json"}
+        )
+        try:
+            translations = json.loads(response.text.strip())
+        except json.JSONDecodeError:
+            return None
+        if (not isinstance(translations, list) or len(translations) != len(sentences)
+                or not all(isinstance(t, str) for t in translations)):
+            return None
+        return [t.strip() for t in translations]
+
+    def _translate_segment(self, text, target_language, language_name):
+        """
+        Translate a single segment, reusing sentence translations from memory.
+
+        Returns:
+            tuple: (translation, sentence_count, sentences_from_memory)
+        """
+        if not self.memory:
+            return self._generate_translation(text, language_name), 1, 0
+
+        units = split_sentences(text)
+        sentences = [body for body, _ in units if body.strip()]
+        known = self.memory.lookup(sentences, target_language)
+
+        # Only sentences missing from memory go to Gemini (each distinct sentence once)
+        missing = list(dict.fromkeys(
+            self.memory.normalize(s) for s in sentences if self.memory.normalize(s) not in known
+        ))
+        from_memory = sum(1 for s in sentences if self.memory.normalize(s) in known)
+
+        if missing:
+            if len(missing) == 1:
+                translations = [self._generate_translation(missing[0], language_name)]
+            else:
+                translations = self._generate_sentence_translations(missing, language_name)
+            if translations is None:
+                # The model did not return one translation per sentence; translate the
+                # segment as a whole and leave the memory untouched
+                return self._generate_translation(text, language_name), len(sentences), 0
+            pairs = list(zip(missing, translations))
+            self.memory.store(pairs, target_language)
+            known.update(pairs)
+
+        parts = []
+        for body, separator in units:
+            parts.append((known[self.memory.normalize(body)] if body.strip() else body) + separator)
+        return "".join(parts).strip(), len(sentences), from_memory
+
+    def _iter_segment_translations(self, segments, target_language, language_name):
+        """
+        Translate segments concurrently, yielding them as they complete.
+
+        Yields:
+            tuple: (index, translated_segment, sentence_count, sentences_from_memory)
+            in completion order.
+        """
+        work = [i for i, (segment, _) in enumerate(segments) if segment.strip()]
+
+        # Whitespace-only segments (e.g. leading blank lines) are passed through untouched
+        for i, (segment, _) in enumerate(segments):
+            if not segment.strip():
+                yield i, segment, 0, 0
+
+        if len(work) == 1:
+            i = work[0]
+            yield (i, *self._translate_segment(segments[i][0], target_language, language_name))
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(work)) or 1) as executor:
+            futures = {
+                executor.submit(self._translate_segment, segments[i][0], target_language, language_name): i
+                for i in work
+            }
+            for future in as_completed(futures):
+                yield (futures[future], *future.result())
+
+    def _translate_text(self, text, target_language, language_name):
+        """
+        Translate text of any length, splitting it into segments when needed.
+
+        Returns:
+            tuple: (translation, sentence_count, sentences_from_memory)
+        """
+        segments = split_into_segments(text, self.segment_max_chars)
+        translated = [None] * len(segments)
+        total = 0
+        reused = 0
+        for i, translation, count, from_memory in self._iter_segment_translations(
+                segments, target_language, language_name):
+            translated[i] = translation
+            total += count
+            reused += from_memory
+        return "".join(t + sep for t, (_, sep) in zip(translated, segments)).strip(), total, reused
+
+    def translate(self, text, target_language="en", use_cache=True):
         """
         Translates the given text to the target language.
 
+        Long texts are split at paragraph and sentence boundaries into segments
+        that are translated concurrently and reassembled in order.
+
         Args:
             text (str): The text to translate.
             target_language (str): The language code to translate to (default: "en").
+            use_cache (bool): Whether to serve the translation from the response cache.
 
         Returns:
             dict: Dictionary containing the translated text and metadata.
         """
-        if not text:
-            return {"error": "No text provided"}
-            
-        # Get the language name
-        language_name = self.languages.get(target_language, "Unknown")
-        if language_name == "Unknown":
-            return {"error": f"Unsupported language code: {target_language}"}
-            
+        language_name, error = self._validate(text, target_language)
+        if error:
+            return {"error": error}
+
+        memory_stats = {}
+
+        def generate():
+            translation, total, reused = self._translate_text(text, target_language, language_name)
+            memory_stats["total"] = total
+            memory_stats["reused"] = reused
+            return translation
+
+        cached = False
+        if self.cache:
+            translation, cached = self.cache.get_or_compute(
+                "translator",
+                self.model_name,
+                self.PROMPT_VERSION,
+                {"text": text, "target_language": target_language},
+                generate,
+                use_cache=use_cache
+            )
+        else:
+            translation = generate()
+        
+        result = {
+            "original": text,
+            "translation": translation,
+            "target_language": target_language,
+            "target_language_name": language_name,
+            "cached": cached
+        }
+        if self.memory and memory_stats:
+            result["memory_hit_ratio"] = (
+                memory_stats["reused"] / memory_stats["total"] if memory_stats["total"] else 0.0
+            )
+        return result
+
+    def _translate_combined(self, text, target_languages):
+        """
+        Translate text into several languages with a single structured prompt.
+
+        Returns:
+            dict: Language code -> translation for every language the model returned.
+        """
+        language_list = "\n".join(f'- "{code}": {self.languages[code]}' for code in target_languages)
         prompt = f"""
-Translate the following text into {language_name}. Use only that language, except for proper nouns or names, which should remain in English. Preserve meaning, tone, and formatting. Adapt cultural references or idioms as needed.
+Translate the following text into each of the languages listed below. For each language, use only that language, except for proper nouns or names, which should remain in English. Preserve meaning, tone, and formatting. Adapt cultural references or idioms as needed.
+
+Languages (JSON key: language):
+{language_list}
+
+Return only a JSON object mapping each language key to its translation.
 
 Text:
 {text}
-
-Translation ({language_name}):
 """
 
-        response = self.model.generate_content(prompt)
-        translation = response.text.strip()
-        
+        response = generate_content(
+            "translator",
+            self.model,
+            prompt,
+            generation_config={"response_mime_type": "application/json"}
+        )
+        raw = response.text.strip()
+
+        # Tolerate a fenced code block around the JSON
+        fenced = re.search(r'```(?:json)?\s*(.*?)```', raw, re.DOTALL)
+        if fenced:
+            raw = fenced.group(1)
+        try:
+            parsed = json.loads(raw)
+        except json.JSONDecodeError:
+            record_error("translator", "combined_parse")
+            return {}
+        if not isinstance(parsed, dict):
+            return {}
+        return {
+            code: parsed[code].strip()
+            for code in target_languages
+            if isinstance(parsed.get(code), str) and parsed[code].strip()
+        }
+
+    def translate_many(self, text, target_languages, mode="parallel", use_cache=True):
+        """
+        Translates the given text into several target languages in one call.
+
+        Args:
+            text (str): The text to translate.
+            target_languages (list): Language codes to translate to.
+            mode (str): "parallel" runs one translation per language concurrently;
+                "combined" asks for all languages in a single structured prompt and
+                falls back to "parallel" for long texts or languages it misses.
+            use_cache (bool): Whether to serve translations from the response cache.
+
+        Returns:
+            dict: Dictionary containing one translation entry per language code.
+        """
+        if not text:
+            return {"error": "No text provided"}
+        if mode not in ("parallel", "combined"):
+            return {"error": f"Unsupported mode: {mode}"}
+
+        if isinstance(target_languages, str):
+            target_languages = [code.strip() for code in target_languages.split(",") if code.strip()]
+        elif not isinstance(target_languages, list) or not all(isinstance(code, str) for code in target_languages):
+            return {"error": "target_languages must be a list of language codes or a comma-separated string"}
+
+        # Preserve request order and drop duplicates
+        target_languages = list(dict.fromkeys(target_languages))
+        if not target_languages:
+            return {"error": "No target languages provided"}
+        unsupported = [code for code in target_languages if code not in self.languages]
+        if unsupported:
+            return {"error": f"Unsupported language code(s): {', '.join(unsupported)}"}
+
+        translations = {}
+
+        # The combined prompt only makes sense when the whole text fits one segment
+        if mode == "combined" and len(text) <= self.segment_max_chars:
+            combined, cached = None, False
+            if self.cache:
+                inputs = {"text": text, "target_languages": sorted(target_languages)}
+                if use_cache:
+                    key, combined = self.cache.lookup("translator_multi", self.model_name, self.PROMPT_VERSION, inputs)
+                else:
+                    key = self.cache.make_key("translator_multi", self.model_name, self.PROMPT_VERSION, inputs)
+                cached = combined is not None
+
+            if combined is None:
+                combined = self._translate_combined(text, target_languages)
+                # An unparseable or partial response is not cached; missing languages fall back to "parallel"
+                if self.cache and len(combined) == len(target_languages):
+                    self.cache.set(key, "translator_multi", combined)
+
+            for code, translation in combined.items():
+                translations[code] = {
+                    "translation": translation,
+                    "target_language": code,
+                    "target_language_name": self.languages[code],
+                    "cached": cached
+                }
+
+        remaining = [code for code in target_languages if code not in translations]
+        if remaining:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(remaining))) as executor:
+                futures = {
+                    code: executor.submit(self.translate, text, code, use_cache)
+                    for code in remaining
+                }
+                for code, future in futures.items():
+                    result = future.result()
+                    result.pop("original", None)
+                    translations[code] = result
+
         return {
             "original": text,
-            "translation": translation,
-            "target_language": target_language,
-            "target_language_name": language_name
-        }
\ No newline at end of file
+            "mode": mode,
+            "translations": {code: translations[code] for code in target_languages}
+        }
+
+    def translate_stream(self, text, target_language="en", use_cache=True):
+        """
+        Translates the given text, yielding segments as soon as each one completes.
+
+        Segments can arrive out of order; each event carries its index and the
+        whitespace that followed it in the original so the client can reassemble.
+
+        Args:
+            text (str): The text to translate.
+            target_language (str): The language code to translate to (default: "en").
+            use_cache (bool): Whether to serve the translation from the response cache.
+
+        Yields:
+            dict: A "start" event, one "segment" event per segment, then a "done" event.
+        """
+        language_name, error = self._validate(text, target_language)
+        if error:
+            yield {"event": "error", "error": error}
+            return
+
+        cache_inputs = {"text": text, "target_language": target_language}
+        key = None
+        if self.cache and use_cache:
+            key, translation = self.cache.lookup(
+                "translator", self.model_name, self.PROMPT_VERSION, cache_inputs
+            )
+            if translation is not None:
+                yield {"event": "start", "segments": 1, "target_language": target_language,
+                       "target_language_name": language_name, "cached": True}
+                yield {"event": "segment", "index": 0, "translation": translation, "separator": ""}
+                yield {"event": "done", "translation": translation}
+                return
+
+        segments = split_into_segments(text, self.segment_max_chars)
+        yield {"event": "start", "segments": len(segments), "target_language": target_language,
+               "target_language_name": language_name, "cached": False}
+
+        translated = [None] * len(segments)
+        total = 0
+        reused = 0
+        for i, translation, count, from_memory in self._iter_segment_translations(
+                segments, target_language, language_name):
+            translated[i] = translation
+            total += count
+            reused += from_memory
+            yield {"event": "segment", "index": i, "translation": translation, "separator": segments[i][1]}
+
+        full_translation = "".join(t + sep for t, (_, sep) in zip(translated, segments)).strip()
+        if self.cache:
+            if key is None:
+                key = self.cache.make_key("translator", self.model_name, self.PROMPT_VERSION, cache_inputs)
+            self.cache.set(key, "translator", full_translation)
+
+        done = {"event": "done", "translation": full_translation}
+        if self.memory:
+            done["memory_hit_ratio"] = reused / total if total else 0.0
+        yield done
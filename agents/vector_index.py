@@ -0,0 +1,147 @@
+import numpy as np
+
+from agents.retrieval_filters import metadata_columns, where_mask
+
+
+def similarity_to_distance(similarities, space="l2"):
+    """
+    Convert cosine similarities of unit vectors to Chroma's distance for a "hnsw:space".
+
+    Args:
+        similarities (np.ndarray): Dot products of L2-normalized vectors.
+        space (str): "l2" (squared L2), "cosine" or "ip".
+    """
+    if space in ("cosine", "ip"):
+        return 1.0 - similarities
+    # Squared L2 between unit vectors
+    return np.maximum(2.0 - 2.0 * similarities, 0.0)
+
+
+class NumpyVectorIndex:
+    def __init__(self, ids, embeddings, documents=None, metadatas=None, embedding_function=None, space="l2"):
+        """
+        Initialize an exact in-memory vector index.
+
+        All embeddings are stored in one contiguous, L2-normalized float32 matrix,
+        so a query is a single matrix-vector product followed by argpartition.
+        For collections of a few thousand chunks this is faster than Chroma's
+        SQLite + HNSW query path, and exact rather than approximate.
+
+        Args:
+            ids (list): Document IDs, one per row.
+            embeddings (array-like): Embeddings, shape (n, dim).
+            documents (list): Document texts, one per row.
+            metadatas (list): Metadata dicts, one per row.
+            embedding_function (callable): Used to embed query_texts.
+            space (str): Distance reported like Chroma's "hnsw:space": "l2" (squared
+                L2 between the normalized vectors), "cosine" or "ip".
+        """
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(ids), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+
+        self.ids = list(ids)
+        self.matrix = matrix
+        self.documents = list(documents) if documents is not None else [None] * len(self.ids)
+        self.metadatas = list(metadatas) if metadatas is not None else [None] * len(self.ids)
+        self.embedding_function = embedding_function
+        self.space = space
+        # Filterable metadata as columns, so a where clause is a vectorized mask
+        self.columns = metadata_columns(self.metadatas)
+
+    @classmethod
+    def from_collection(cls, collection, embedding_function=None, batch_size=1000):
+        """
+        Load every embedding, document and metadata of a Chroma collection.
+
+        The index is a snapshot; rebuild it (e.g. restart the app) after re-ingesting.
+
+        Args:
+            collection (chromadb.Collection): The collection to load.
+            embedding_function (callable): Used to embed query_texts.
+            batch_size (int): Rows fetched per collection.get() call.
+        """
+        ids, embeddings, documents, metadatas = [], [], [], []
+        total = collection.count()
+        for offset in range(0, total, batch_size):
+            batch = collection.get(
+                limit=batch_size,
+                offset=offset,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            ids.extend(batch["ids"])
+            embeddings.extend(batch["embeddings"])
+            documents.extend(batch["documents"])
+            metadatas.extend(batch["metadatas"])
+
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        return cls(ids, embeddings, documents, metadatas, embedding_function=embedding_function, space=space)
+
+    def count(self):
+        return len(self.ids)
+
+    def memory_usage(self):
+        """Returns the bytes used by the embedding matrix."""
+        return self.matrix.nbytes
+
+    def query(self, query_embeddings=None, query_texts=None, n_results=10, where=None,
+              include=("documents", "metadatas", "distances")):
+        """
+        Find the nearest documents, returning the same shape as collection.query.
+
+        Args:
+            query_embeddings (array-like): One embedding per query.
+            query_texts (list): Query strings, embedded with embedding_function.
+            n_results (int): Number of results per query.
+            where (dict): Chroma-style metadata filter applied before ranking.
+            include (iterable): Any of "documents", "metadatas", "distances", "embeddings".
+
+        Returns:
+            dict: "ids" plus the requested fields, each a list with one list per query.
+        """
+        if query_embeddings is None:
+            if query_texts is None or self.embedding_function is None:
+                raise ValueError("query_embeddings, or query_texts with an embedding_function, are required")
+            query_embeddings = self.embedding_function(query_texts)
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        results = {"ids": []}
+        for field in include:
+            results[field] = []
+
+        mask = where_mask(self.columns, where, len(self.ids)) if where else None
+        k = min(int(n_results), len(self.ids) if mask is None else int(mask.sum()))
+        if k <= 0:
+            for field in results:
+                results[field] = [[] for _ in range(len(queries))]
+            return results
+
+        similarities = queries @ self.matrix.T
+        if mask is not None:
+            similarities[:, ~mask] = -np.inf
+        if k < similarities.shape[1]:
+            top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(similarities.shape[1]), (len(queries), 1))
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for row, score_row in zip(top, top_scores):
+            results["ids"].append([self.ids[i] for i in row])
+            if "documents" in results:
+                results["documents"].append([self.documents[i] for i in row])
+            if "metadatas" in results:
+                results["metadatas"].append([self.metadatas[i] for i in row])
+            if "distances" in results:
+                results["distances"].append(similarity_to_distance(score_row, self.space).tolist())
+            if "embeddings" in results:
+                results["embeddings"].append(self.matrix[row])
+        return results
@@ -1,8 +1,13 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g, send_file
 import os
+import json
 import sys
+import time
+import hmac
+import random
 import chromadb
 from chromadb.config import Settings
+from chromadb.api.client import SharedSystemClient
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -17,22 +22,219 @@ from agents.translator_agent import TranslatorAgent
 from agents.summarizer_agent import SummarizerAgent
 from agents.planner_agent import PlannerAgent
 from agents.todo_agent import TodoAgent
+from agents.response_cache import ResponseCache
+from agents.translation_memory import TranslationMemory
+from agents.plan_store import PlanStore
+from agents.metrics import (
+    REQUEST_COUNT, REQUEST_LATENCY, ResponseCacheCollector, register_collector, render_metrics,
+    record_worker_memory
+)
+from agents.profiler import SamplingProfiler, ProfileStore
+from agents.vector_index import NumpyVectorIndex
+from agents.quantized_index import QuantizedVectorIndex
+from agents.shard_router import CentroidShardRouter
+from agents.retrieval_filters import parse_filters
+from agents.parent_store import ParentStore
 
 app = Flask(__name__)
 
 # Initialize ChromaDB client
 CHROMA_DB_PATH = os.path.join(os.path.dirname(__file__), "processed_data/chroma_db")
-client = chromadb.PersistentClient(
-    path=CHROMA_DB_PATH,
-    settings=Settings(allow_reset=True, is_persistent=True)
+
+
+def create_chroma_client():
+    return chromadb.PersistentClient(
+        path=CHROMA_DB_PATH,
+        settings=Settings(allow_reset=True, is_persistent=True)
+    )
+
+
+client = create_chroma_client()
+
+# Shared on-disk cache for Gemini responses (survives restarts, shared across workers)
+RESPONSE_CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "processed_data/response_cache.sqlite3")
+)
+response_cache = ResponseCache(
+    RESPONSE_CACHE_PATH,
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_MB", "100")) * 1024 * 1024,
+    max_age_seconds=int(os.getenv("RESPONSE_CACHE_MAX_AGE_HOURS", "168")) * 3600
+)
+register_collector(ResponseCacheCollector(response_cache))
+
+# Sentence-level translation memory reused across requests
+TRANSLATION_MEMORY_PATH = os.getenv(
+    "TRANSLATION_MEMORY_PATH",
+    os.path.join(os.path.dirname(__file__), "processed_data/translation_memory.sqlite3")
 )
+translation_memory = TranslationMemory(TRANSLATION_MEMORY_PATH)
 
 # Initialize agents
-history_agent = HistoryQuestionAnswerer(client=client, collection_name="textbook")
-translator_agent = TranslatorAgent()
-summarizer_agent = SummarizerAgent()
-planner_agent = PlannerAgent()
-todo_agent = TodoAgent()
+# History retrieval searches one collection per book or subject ("shards")
+HISTORY_COLLECTIONS = [name.strip() for name in os.getenv("HISTORY_COLLECTIONS", "textbook").split(",") if name.strip()]
+# Parent windows of collections ingested for small-to-big retrieval
+parent_store = ParentStore(os.getenv(
+    "PARENT_DB_PATH",
+    os.path.join(os.path.dirname(__file__), "processed_data/parents.sqlite3")
+))
+history_agent = HistoryQuestionAnswerer(
+    client=client,
+    collection_name=HISTORY_COLLECTIONS,
+    parent_store=parent_store,
+    context_token_budget=int(os.getenv("HISTORY_CONTEXT_TOKENS", "3000")) or None,
+    # Characters of question-relevant passages kept from each scraped page
+    web_passage_chars=int(os.getenv("HISTORY_WEB_PASSAGE_CHARS", "1500")),
+    # "lxml" (default when installed) or "bs4" page extraction
+    html_backend=os.getenv("HISTORY_HTML_BACKEND") or None
+)
+# Optionally answer queries from an exact in-memory index loaded from each collection,
+# or from memory-mapped quantized indexes built with src/build_quantized_index.py
+HISTORY_VECTOR_INDEX = os.getenv("HISTORY_VECTOR_INDEX", "chroma")
+HISTORY_VECTOR_INDEX_DIR = os.getenv(
+    "HISTORY_VECTOR_INDEX_DIR", os.path.join(os.path.dirname(__file__), "processed_data/vector_index")
+)
+for name, collection in history_agent.collections.items():
+    if HISTORY_VECTOR_INDEX == "numpy":
+        history_agent.vector_indexes[name] = NumpyVectorIndex.from_collection(
+            collection, embedding_function=history_agent.embedding_function
+        )
+    elif HISTORY_VECTOR_INDEX == "quantized":
+        history_agent.vector_indexes[name] = QuantizedVectorIndex(
+            os.path.join(HISTORY_VECTOR_INDEX_DIR, name),
+            collection=collection,
+            embedding_function=history_agent.embedding_function,
+            nprobe=int(os.getenv("HISTORY_VECTOR_INDEX_NPROBE", "16")),
+            rerank=int(os.getenv("HISTORY_VECTOR_INDEX_RERANK", "100"))
+        )
+# Optionally search only the shards whose centroid is close to the question
+if os.getenv("HISTORY_SHARD_ROUTING", "all") == "centroid" and len(HISTORY_COLLECTIONS) > 1:
+    history_agent.router = CentroidShardRouter.from_collections(
+        history_agent.collections,
+        margin=float(os.getenv("HISTORY_SHARD_ROUTER_MARGIN", "0.05")),
+        max_shards=int(os.getenv("HISTORY_SHARD_MAX", "0")) or None
+    )
+translator_agent = TranslatorAgent(cache=response_cache, memory=translation_memory)
+# Reuse the already-loaded SentenceTransformer for extractive pre-summarization
+summarizer_agent = SummarizerAgent(cache=response_cache, embedding_function=history_agent.embedding_function)
+plan_store = PlanStore(
+    os.getenv("PLAN_DB_PATH", os.path.join(os.path.dirname(__file__), "processed_data/plans.sqlite3")),
+    max_memory_bytes=int(os.getenv("PLAN_STORE_MAX_MEMORY_MB", "8")) * 1024 * 1024
+)
+planner_agent = PlannerAgent(cache=response_cache, plan_store=plan_store)
+todo_agent = TodoAgent(
+    db_path=os.getenv("TODO_DB_PATH", os.path.join(os.path.dirname(__file__), "processed_data/todo.sqlite3")),
+    # Deletions are reported to delta-sync clients for this many versions
+    tombstone_retention=int(os.getenv("TODO_TOMBSTONE_RETENTION", "1000"))
+)
+
+# Request profiling: on demand for admins, and a sampled fraction of API requests
+PROFILER_ADMIN_TOKEN = os.getenv("PROFILER_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+profile_store = ProfileStore(
+    os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "processed_data/profiles")),
+    max_files=int(os.getenv("PROFILE_MAX_FILES", "200"))
+)
+
+
+def reinitialize_after_fork():
+    """
+    Recreate per-process resources in a freshly forked worker.
+
+    The embedding model weights loaded by the master are shared copy-on-write and
+    kept as they are; the Chroma client holds SQLite connections and background
+    threads, and the scraping session holds pooled sockets. Neither may be shared
+    across processes, so both are rebuilt.
+    """
+    global client
+    # Chroma caches one system per path; drop the copy inherited from the master
+    SharedSystemClient.clear_system_cache()
+    client = create_chroma_client()
+    history_agent.reset_client(client)
+    # Pooled keep-alive sockets must not be shared with the master process
+    history_agent.http_client.reset()
+
+
+@app.before_request
+def start_request_timer():
+    g.start_time = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    # Label by the route template, not the raw path, to keep cardinality bounded
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    start_time = g.get("start_time")
+    if start_time is not None:
+        latency = REQUEST_LATENCY.labels(method=request.method, route=route)
+        if response.is_streamed:
+            # A streamed body is still being generated; time it until the response is closed
+            response.call_on_close(lambda: latency.observe(time.perf_counter() - start_time))
+        else:
+            latency.observe(time.perf_counter() - start_time)
+    REQUEST_COUNT.labels(method=request.method, route=route, status=response.status_code).inc()
+    return response
+
+
+@app.route('/metrics')
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+
+@app.route('/api/worker/memory', methods=['GET'])
+def worker_memory():
+    usage = record_worker_memory()
+    if usage is None:
+        return jsonify({"error": "Memory details are only available on Linux"}), 501
+    return jsonify({"pid": os.getpid(), "memory": usage})
+
+
+def is_profiler_admin():
+    # Admin tokens are only accepted in a header so they do not end up in access logs
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(PROFILER_ADMIN_TOKEN) and hmac.compare_digest(token, PROFILER_ADMIN_TOKEN)
+
+
+@app.before_request
+def start_profiler():
+    flag = request.headers.get('X-Profile') or request.args.get('profile')
+    explicit = flag in ('1', 'true') and is_profiler_admin()
+    sampled = (PROFILE_SAMPLE_RATE > 0 and request.path.startswith('/api/')
+               and random.random() < PROFILE_SAMPLE_RATE)
+    if explicit or sampled:
+        g.profiler = SamplingProfiler(interval=PROFILE_INTERVAL_MS / 1000).start()
+        g.profile_explicit = explicit
+
+
+@app.after_request
+def finish_profiler(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    name = profile_store.new_name(route)
+    if g.get('profile_explicit'):
+        response.headers['X-Profile-Id'] = name
+
+    # Stop once the body has been sent, so streamed responses are covered too
+    def save_profile():
+        profile_store.save(name, profiler.stop())
+
+    response.call_on_close(save_profile)
+    return response
+
+
+@app.route('/api/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    if not is_profiler_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    path = profile_store.path(name)
+    if path is None:
+        return jsonify({"error": f"Profile {name} not found"}), 404
+    return send_file(path, mimetype='text/plain')
 
 
 @app.route('/')
@@ -65,16 +267,41 @@ def todo():
     return render_template('todo.html')
 
 
+def request_flag(data, name, default=True):
+    """
+    Read a boolean option from a JSON request body.
+
+    Strings such as "false", "0" or "no" are parsed rather than taken by their
+    truthiness; unrecognized values keep the default.
+    """
+    value = data.get(name, default)
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ("true", "1", "yes", "on"):
+            return True
+        if value in ("false", "0", "no", "off", ""):
+            return False
+        return default
+    if value is None:
+        return default
+    return bool(value)
+
+
 @app.route('/api/history/answer', methods=['POST'])
 def get_history_answer():
     data = request.json
     question = data.get('question', '')
+    shards = data.get('shards')
     if not question:
         return jsonify({"error": "No question provided"}), 400
     
     try:
-        result = history_agent.answer_question(question)
+        # Optional scope, e.g. {"chapter": 3, "section": "3.2", "page_start": 40, "page_end": 55}
+        where = parse_filters(data.get('filters'))
+        result = history_agent.answer_question(question, shards=shards, where=where)
         return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -84,28 +311,65 @@ def translate_text():
     data = request.json
     text = data.get('text', '')
     target_language = data.get('target_language', 'en')
+    target_languages = data.get('target_languages')
+    mode = data.get('mode', 'parallel')
+    use_cache = request_flag(data, 'use_cache')
     
     if not text:
         return jsonify({"error": "No text provided"}), 400
     
     try:
-        result = translator_agent.translate(text, target_language)
+        # A list of target languages is fanned out in a single request
+        if target_languages not in (None, ""):
+            result = translator_agent.translate_many(text, target_languages, mode=mode, use_cache=use_cache)
+        else:
+            result = translator_agent.translate(text, target_language, use_cache=use_cache)
+        if "error" in result:
+            return jsonify(result), 400
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/translate/stream', methods=['POST'])
+def translate_text_stream():
+    data = request.json
+    text = data.get('text', '')
+    target_language = data.get('target_language', 'en')
+    use_cache = request_flag(data, 'use_cache')
+    
+    if not text:
+        return jsonify({"error": "No text provided"}), 400
+    
+    def generate():
+        # One JSON object per line so the client can render segments as they arrive
+        try:
+            for event in translator_agent.translate_stream(text, target_language, use_cache=use_cache):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.route('/api/summarize', methods=['POST'])
 def summarize_text():
     data = request.json
     text = data.get('text', '')
     length = data.get('length', 'medium')
+    mode = data.get('mode', 'auto')
+    extractive_only = request_flag(data, 'extractive_only', False)
+    use_cache = request_flag(data, 'use_cache')
     
     if not text:
         return jsonify({"error": "No text provided"}), 400
     
     try:
-        result = summarizer_agent.summarize(text, length)
+        result = summarizer_agent.summarize(
+            text, length, use_cache=use_cache, mode=mode, extractive_only=extractive_only
+        )
+        if "error" in result:
+            return jsonify(result), 400
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -116,12 +380,84 @@ def create_plan():
     data = request.json
     goal = data.get('goal', '')
     deadline = data.get('deadline', '')
+    use_cache = request_flag(data, 'use_cache')
     
     if not goal:
         return jsonify({"error": "No goal provided"}), 400
     
     try:
-        result = planner_agent.create_plan(goal, deadline)
+        result = planner_agent.create_plan(goal, deadline, use_cache=use_cache)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/todo/batch', methods=['POST'])
+def batch_todos():
+    data = request.json
+    operations = data.get('operations')
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "No operations provided"}), 400
+    
+    try:
+        result = todo_agent.apply_batch(operations)
+        if "error" in result:
+            # A rolled-back batch keeps its per-operation results so the client can see what failed
+            return jsonify(result), 409 if "results" in result else 400
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    try:
+        stats = response_cache.stats()
+        stats["translation_memory"] = translation_memory.stats()
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/plan/<plan_id>', methods=['GET'])
+def get_plan(plan_id):
+    try:
+        result = planner_agent.get_plan(plan_id)
+        if "error" in result:
+            return jsonify(result), 404
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/plan/<plan_id>/refine', methods=['POST'])
+def refine_plan(plan_id):
+    data = request.json
+    part_id = data.get('part_id', '')
+    instructions = data.get('instructions', '')
+    use_cache = request_flag(data, 'use_cache')
+
+    if not part_id or not instructions:
+        return jsonify({"error": "part_id and instructions are required"}), 400
+
+    try:
+        result = planner_agent.refine_plan(plan_id, part_id, instructions, use_cache=use_cache)
+        if "error" in result:
+            status = 404 if "not found" in result["error"] else 400
+            return jsonify(result), status
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/plans', methods=['GET'])
+def list_plans():
+    try:
+        result = planner_agent.list_plans(
+            limit=request.args.get('limit', 20, type=int),
+            offset=request.args.get('offset', 0, type=int)
+        )
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -147,8 +483,34 @@ def add_todo():
 @app.route('/api/todo/get', methods=['GET'])
 def get_todos():
     try:
-        todos = todo_agent.get_tasks()
-        return jsonify({"todos": todos})
+        # The store version changes with every write, so it doubles as the ETag
+        etag = f"todo-v{todo_agent.get_version()}"
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        since = request.args.get('since', type=int)
+        if since is not None:
+            response = jsonify(todo_agent.get_changes(since))
+            response.set_etag(etag)
+            return response
+        
+        result = todo_agent.query_tasks(
+            status=request.args.get('status', 'all'),
+            priority=request.args.get('priority') or None,
+            due_before=request.args.get('due_before') or None,
+            due_after=request.args.get('due_after') or None,
+            sort_by=request.args.get('sort', 'created_at'),
+            order=request.args.get('order', 'asc'),
+            limit=request.args.get('limit', 50, type=int),
+            cursor=request.args.get('cursor') or None
+        )
+        if "error" in result:
+            return jsonify(result), 400
+        response = jsonify(result)
+        response.set_etag(etag)
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -0,0 +1,65 @@
+import io
+import json
+from contextlib import redirect_stdout
+
+from benchmarks.common import measure
+
+
+def bench_clean_text(ctx):
+    """TextbookProcessor._clean_text per page."""
+    processor = ctx.new_processor()
+    pages = ctx.raw_pages
+    return measure(
+        lambda: [processor._clean_text(page) for page in pages],
+        repeat=ctx.args.repeat,
+        items=len(pages)
+    )
+
+
+def bench_extract_section_info(ctx):
+    """TextbookProcessor._extract_section_info per page."""
+    processor = ctx.new_processor()
+    pages = [processor._clean_text(page) for page in ctx.raw_pages]
+    return measure(
+        lambda: [processor._extract_section_info(page, i + 1) for i, page in enumerate(pages)],
+        repeat=ctx.args.repeat,
+        items=len(pages)
+    )
+
+
+def bench_chunk_text(ctx):
+    """TextbookProcessor.chunk_text per page, including writing the JSON and CSV output."""
+    processor = ctx.processed_pages()
+
+    def reset():
+        processor.chunks = []
+        processor.chunks_metadata = []
+
+    def run():
+        with redirect_stdout(io.StringIO()):
+            processor.chunk_text(ctx.args.chunk_size, ctx.args.chunk_overlap, "bench_chunk_text")
+
+    result = measure(run, repeat=ctx.args.repeat, items=len(processor.pages_text), setup=reset)
+    result["chunks"] = len(processor.chunks)
+    return result
+
+
+def bench_create_chroma_db(ctx):
+    """create_chroma_db ingestion rate (embedding plus Chroma insert) in chunks per second."""
+    with open(ctx.chunks_path, "r", encoding="utf-8") as f:
+        chunk_count = len(json.load(f)["chunks"])
+    # Ingestion is slow with real embeddings, so it is not repeated as often
+    return measure(
+        lambda: ctx.ingest("bench_ingest"),
+        repeat=max(1, ctx.args.repeat // 5),
+        warmup=0,
+        items=chunk_count
+    )
+
+
+BENCHMARKS = {
+    "clean_text": bench_clean_text,
+    "extract_section_info": bench_extract_section_info,
+    "chunk_text": bench_chunk_text,
+    "create_chroma_db": bench_create_chroma_db,
+}
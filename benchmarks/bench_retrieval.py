@@ -0,0 +1,74 @@
+import itertools
+
+from benchmarks.common import measure
+from benchmarks.context import QUERIES
+
+
+def bench_encode_throughput(ctx):
+    """SentenceTransformer encode throughput at several batch sizes."""
+    if not ctx.uses_real_embeddings:
+        return {"skipped": "SentenceTransformer model not available offline"}
+
+    texts = ctx.chunk_texts()
+    results = {}
+    for batch_size in (1, 8, 32):
+        batch = (texts * ((batch_size // max(len(texts), 1)) + 1))[:batch_size]
+        results[f"batch_{batch_size}"] = measure(
+            lambda: ctx.embedding_function(batch),
+            repeat=ctx.args.repeat,
+            items=batch_size
+        )
+    return results
+
+
+def bench_retrieve_context(ctx):
+    """retrieve_context latency (query embedding plus Chroma search) at several n_results."""
+    agent = ctx.history_agent
+    results = {"collection_size": agent.collection.count()}
+    for n_results in (1, 5, 10, 20, 50):
+        queries = itertools.cycle(QUERIES)
+        results[f"n_results_{n_results}"] = measure(
+            lambda: agent.retrieve_context(next(queries), n_results=n_results),
+            repeat=ctx.args.repeat
+        )
+    return results
+
+
+def bench_merge_adjacent_chunks(ctx):
+    """Chunk stitching: time and context size saved on runs of neighbouring chunks."""
+    from agents.context_assembly import merge_adjacent_chunks
+
+    # Fetch the chunks of a few consecutive pages, as a focused question would retrieve them
+    collection = ctx.history_agent.collection
+    batch = collection.get(
+        where={"$and": [{"page_number": {"$gte": 10}}, {"page_number": {"$lte": 14}}]},
+        include=["documents", "metadatas"]
+    )
+    documents, metadatas = batch["documents"], batch["metadatas"]
+    plain = len("\n\n".join(documents))
+    merged = len("\n\n".join(passage["text"] for passage in merge_adjacent_chunks(documents, metadatas)))
+    return {
+        "chunks": len(documents),
+        "plain_chars": plain,
+        "merged_chars": merged,
+        "saved_fraction": 1 - merged / plain if plain else 0.0,
+        "timing": measure(lambda: merge_adjacent_chunks(documents, metadatas), repeat=ctx.args.repeat)
+    }
+
+
+def bench_find_relevant_urls(ctx):
+    """URL selection over the built-in source list."""
+    agent = ctx.history_agent
+    return measure(
+        lambda: [agent.find_relevant_urls(query) for query in QUERIES],
+        repeat=ctx.args.repeat,
+        items=len(QUERIES)
+    )
+
+
+BENCHMARKS = {
+    "encode_throughput": bench_encode_throughput,
+    "retrieve_context": bench_retrieve_context,
+    "merge_adjacent_chunks": bench_merge_adjacent_chunks,
+    "find_relevant_urls": bench_find_relevant_urls,
+}
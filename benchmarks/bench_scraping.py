@@ -0,0 +1,113 @@
+import io
+from contextlib import redirect_stdout
+from unittest import mock
+
+from benchmarks.common import measure, load_fixture
+from benchmarks.context import QUERIES
+
+WIKIPEDIA_URL = "https://en.wikipedia.org/wiki/Wright_brothers"
+ARTICLE_URL = "https://spacecenter.org/a-look-back-at-the-wright-brothers-first-flight/"
+
+
+def _bench_scrape(ctx, url, fixture_key, query):
+    agent = ctx.history_agent
+    fake_get, pages = ctx.fake_http_get()
+    with mock.patch.object(agent.http_client.session, "get", fake_get):
+        result = measure(
+            lambda: agent.scrape_web_content(url, query),
+            repeat=ctx.args.repeat,
+            setup=agent.url_content_cache.clear
+        )
+        # Size of what goes into the prompt for this source
+        result["content_chars"] = len(agent.scrape_web_content(url, query))
+    result["html_bytes"] = len(pages[fixture_key].encode("utf-8"))
+    return result
+
+
+def bench_wikipedia_parse(ctx):
+    """get_wikipedia_info parsing of a Wikipedia-shaped page (served from a fixture)."""
+    return _bench_scrape(ctx, WIKIPEDIA_URL, "wikipedia", "When were the Wright brothers born?")
+
+
+def bench_article_parse(ctx):
+    """scrape_web_content generic extraction of an article page (served from a fixture)."""
+    return _bench_scrape(ctx, ARTICLE_URL, "article", "What happened on the first flight?")
+
+
+def _extraction_cases(pages, max_paragraphs):
+    from agents.html_extraction import extract_wikipedia, extract_page_text
+
+    return {
+        "wikipedia": lambda backend: extract_wikipedia(pages["wikipedia"], backend, max_paragraphs),
+        "wikipedia_full": lambda backend: extract_wikipedia(pages["wikipedia"], backend),
+        "wikipedia_lead": lambda backend: extract_wikipedia(pages["wikipedia"], backend, 3),
+        "article": lambda backend: extract_page_text(pages["article"], backend),
+    }
+
+
+def bench_html_extraction(ctx):
+    """
+    Parse time of the lxml and BeautifulSoup extraction backends, and whether their output matches.
+
+    Parity is checked on both fixtures, at the benchmark's page size and
+    unrepeated, with and without a paragraph limit. Any mismatch is listed
+    under "failures", which makes benchmarks.run exit non-zero.
+    """
+    from agents.html_extraction import etree
+
+    if etree is None:
+        return {"skipped": "lxml not installed"}
+
+    max_paragraphs = ctx.history_agent.wikipedia_max_paragraphs
+    results = {"failures": []}
+    single_pages = {
+        "wikipedia": load_fixture("wikipedia_article.html"),
+        "article": load_fixture("article.html"),
+    }
+    for name, extract in _extraction_cases(single_pages, max_paragraphs).items():
+        if extract("bs4") != extract("lxml"):
+            results["failures"].append(f"{name} (html_repeat=1): lxml output differs from bs4")
+
+    _, pages = ctx.fake_http_get()
+    for name, extract in _extraction_cases(pages, max_paragraphs).items():
+        timings = {
+            backend: measure(lambda: extract(backend), repeat=ctx.args.repeat)
+            for backend in ("bs4", "lxml")
+        }
+        parity = extract("bs4") == extract("lxml")
+        if not parity:
+            results["failures"].append(f"{name}: lxml output differs from bs4")
+        results[name] = {
+            **timings,
+            "parity": parity,
+            "speedup": timings["bs4"]["p50_ms"] / max(timings["lxml"]["p50_ms"], 1e-9)
+        }
+    return results
+
+
+def bench_answer_question(ctx):
+    """
+    End-to-end answer_question with fake HTTP and a fake Gemini model.
+
+    The one-second politeness delay between scrapes is patched out, so this
+    measures the pipeline's own work.
+    """
+    agent = ctx.history_agent
+    fake_get, _ = ctx.fake_http_get()
+    query = QUERIES[0]
+    with mock.patch.object(agent.http_client.session, "get", fake_get), \
+            mock.patch("agents.history_agent.time.sleep"), \
+            redirect_stdout(io.StringIO()):
+        return measure(
+            lambda: agent.answer_question(query),
+            repeat=ctx.args.repeat,
+            setup=agent.url_content_cache.clear
+        )
+
+
+BENCHMARKS = {
+    "wikipedia_parse": bench_wikipedia_parse,
+    "article_parse": bench_article_parse,
+    "html_extraction": bench_html_extraction,
+    "answer_question": bench_answer_question,
+}
@@ -0,0 +1,53 @@
+import time
+import itertools
+
+from benchmarks.common import measure
+from benchmarks.context import QUERIES
+
+
+def bench_numpy_vs_chroma(ctx):
+    """NumpyVectorIndex vs. Chroma collection.query: latency and agreement at several k."""
+    from agents.vector_index import NumpyVectorIndex
+
+    collection = ctx.history_agent.collection
+    start = time.perf_counter()
+    index = NumpyVectorIndex.from_collection(collection)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    query_embeddings = [ctx.embedding_function([query]) for query in QUERIES]
+    results = {
+        "collection_size": index.count(),
+        "index_load_ms": load_ms,
+        "index_bytes": index.memory_usage()
+    }
+    for k in (5, 10, 50):
+        chroma_queries = itertools.cycle(query_embeddings)
+        numpy_queries = itertools.cycle(query_embeddings)
+        chroma = measure(
+            lambda: collection.query(query_embeddings=next(chroma_queries), n_results=k),
+            repeat=ctx.args.repeat
+        )
+        numpy_result = measure(
+            lambda: index.query(query_embeddings=next(numpy_queries), n_results=k),
+            repeat=ctx.args.repeat
+        )
+
+        # Fraction of the exact top-k that Chroma's approximate HNSW search also returns
+        overlaps = []
+        for embedding in query_embeddings:
+            exact = set(index.query(query_embeddings=embedding, n_results=k)["ids"][0])
+            approximate = set(collection.query(query_embeddings=embedding, n_results=k)["ids"][0])
+            overlaps.append(len(exact & approximate) / max(len(exact), 1))
+
+        results[f"k_{k}"] = {
+            "chroma": chroma,
+            "numpy": numpy_result,
+            "speedup": chroma["mean_ms"] / numpy_result["mean_ms"] if numpy_result["mean_ms"] else None,
+            "chroma_recall_vs_exact": sum(overlaps) / len(overlaps)
+        }
+    return results
+
+
+BENCHMARKS = {
+    "numpy_vs_chroma": bench_numpy_vs_chroma,
+}
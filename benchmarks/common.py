@@ -0,0 +1,250 @@
+import os
+import re
+import json
+import time
+import zlib
+import random
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+REPEAT_PATTERN = re.compile(r'<!-- repeat -->(.*?)<!-- /repeat -->', re.DOTALL)
+
+
+class FakeUsageMetadata:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class FakeGeminiResponse:
+    def __init__(self, text, prompt):
+        self.text = text
+        # Roughly four characters per token, like Gemini's tokenizer on English text
+        self.usage_metadata = FakeUsageMetadata(len(prompt) // 4, len(text) // 4)
+
+
+class FakeGenerativeModel:
+    """Stands in for genai.GenerativeModel so benchmarks need no API key or network."""
+
+    def __init__(self, model_name="fake-gemini", delay=0.0):
+        self.model_name = model_name
+        self.delay = delay
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        prompt = prompt if isinstance(prompt, str) else str(prompt)
+        if generation_config and generation_config.get("response_mime_type") == "application/json":
+            return FakeGeminiResponse("[]", prompt)
+        words = re.findall(r'\w+', prompt[-2000:])
+        return FakeGeminiResponse(" ".join(words[:120]) + ".", prompt)
+
+
+class FakeEmbeddingFunction:
+    """
+    Deterministic hashed bag-of-words embeddings.
+
+    Used when the SentenceTransformer model is not available offline. Search
+    quality is meaningless, but vector sizes and call patterns match the real model.
+    """
+
+    def __init__(self, dim=768):
+        self.dim = dim
+
+    def __call__(self, input):
+        if isinstance(input, str):
+            input = [input]
+        embeddings = np.zeros((len(input), self.dim), dtype=np.float32)
+        for row, text in enumerate(input):
+            for token in re.findall(r'\w+', text.lower()):
+                h = zlib.crc32(token.encode("utf-8"))
+                embeddings[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.maximum(norms, 1e-12)
+        return embeddings.tolist()
+
+
+class FakeHTTPResponse:
+    """Minimal requests.Response replacement serving fixture HTML."""
+
+    def __init__(self, text, url, status_code=200, content_type="text/html; charset=utf-8"):
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.url = url
+        self.status_code = status_code
+        self.headers = {"Content-Type": content_type}
+        self.encoding = "utf-8"
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"{self.status_code} Error for url: {self.url}")
+
+    def iter_content(self, chunk_size=65536, decode_unicode=False):
+        data = self.text if decode_unicode else self.content
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+def load_fixture(name, repeat=1):
+    """
+    Load a fixture HTML file, repeating its <!-- repeat --> block to reach realistic page sizes.
+
+    Args:
+        name (str): File name inside benchmarks/fixtures.
+        repeat (int): How many times the repeatable block appears.
+    """
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        html = f.read()
+    return REPEAT_PATTERN.sub(lambda match: match.group(1) * repeat, html)
+
+
+SENTENCES = [
+    "The steam engine transformed how goods were produced and moved across the country.",
+    "Colonial administrators introduced new systems of taxation and land ownership.",
+    "Missionary schools were among the first to teach English to local students.",
+    "Irrigation projects expanded the area of cultivated land in the dry zone.",
+    "The revolution began when the price of bread rose beyond what workers could pay.",
+    "Factories drew large numbers of people from the countryside into growing towns.",
+    "The treaty redrew the borders of several nations and created lasting tensions.",
+    "Railways reduced the time needed to carry crops from the plantations to the port.",
+    "Reformers campaigned for shorter working hours and better conditions for children.",
+    "Historians still debate how much the new inventions improved ordinary lives.",
+    "The first controlled powered flight lasted only twelve seconds.",
+    "Trade unions grew stronger as workers organised to demand fair wages.",
+]
+
+
+def synthetic_textbook_pages(n_pages=200, seed=0):
+    """
+    Build deterministic raw textbook pages resembling pdfplumber output.
+
+    Pages contain chapter and numbered section headings, running footers and stray
+    page numbers so the cleaning and section detection code does real work.
+    """
+    rng = random.Random(seed)
+    pages = []
+    chapter = 0
+    section = 0
+    subsection = 0
+    for page_number in range(1, n_pages + 1):
+        lines = []
+        if page_number % 20 == 1:
+            chapter += 1
+            section = 0
+            lines.append(f"Chapter {chapter}: {rng.choice(['The Industrial Revolution', 'Colonial Rule', 'Education Reform', 'Modern Development'])}")
+        if page_number % 4 == 1:
+            section += 1
+            subsection = 0
+            lines.append(f"{chapter}.{section} {rng.choice(['Causes', 'Key Events', 'Consequences', 'Important People'])}")
+        if page_number % 2 == 0:
+            subsection += 1
+            lines.append(f"{chapter}.{section}.{subsection} {rng.choice(['Background', 'Timeline', 'Impact'])}")
+        for _ in range(rng.randint(4, 7)):
+            paragraph = " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(3, 6)))
+            lines.append(paragraph)
+            lines.append("")
+        lines.append(str(page_number))
+        lines.append(f"Page {page_number} of {n_pages}")
+        pages.append("\n".join(lines))
+    return pages
+
+
+def summarize_timings(seconds, items=None):
+    """
+    Summarize a list of durations in milliseconds.
+
+    Args:
+        seconds (list): Measured durations in seconds.
+        items (int): Items processed per run, to report throughput.
+    """
+    ordered = sorted(seconds)
+    mean = statistics.fmean(ordered)
+    result = {
+        "runs": len(ordered),
+        "mean_ms": mean * 1000,
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] * 1000,
+        "min_ms": ordered[0] * 1000,
+        "max_ms": ordered[-1] * 1000
+    }
+    if items:
+        result["items"] = items
+        result["items_per_second"] = items / mean if mean else None
+        result["mean_ms_per_item"] = mean * 1000 / items
+    return result
+
+
+def measure(fn, repeat=10, warmup=1, items=None, setup=None):
+    """
+    Time fn() several times after a warm-up.
+
+    Args:
+        fn (callable): The code under test.
+        repeat (int): Number of timed runs.
+        warmup (int): Number of untimed runs first.
+        items (int): Items processed per run, to report throughput.
+        setup (callable): Called before every run, outside the timed region.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return summarize_timings(durations, items=items)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stderr=subprocess.DEVNULL,
+            text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def environment_info():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def save_results(results, path=None):
+    """
+    Write results as JSON and return the path.
+
+    By default results go to benchmarks/results/<timestamp>_<revision>.json so
+    runs from different commits can be compared with benchmarks.compare.
+    """
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        meta = results["meta"]
+        stamp = meta["timestamp"].replace(":", "").replace("-", "")
+        path = os.path.join(RESULTS_DIR, f"{stamp}_{meta['git_revision']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    return path
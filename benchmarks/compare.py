@@ -0,0 +1,57 @@
+"""
+Compare two benchmark result files.
+
+Usage:
+
+    python -m benchmarks.compare OLD.json NEW.json
+"""
+import sys
+import json
+
+METRICS = ("mean_ms", "p50_ms", "p95_ms", "items_per_second")
+
+
+def _flatten(node, prefix=""):
+    """Yield (path, metrics) for every measurement in a nested result dict."""
+    if not isinstance(node, dict):
+        return
+    if any(metric in node for metric in METRICS):
+        yield prefix, node
+    for key, value in node.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}.{key}" if prefix else key)
+
+
+def compare(old, new):
+    old_rows = dict(_flatten(old["benchmarks"]))
+    rows = []
+    for path, metrics in _flatten(new["benchmarks"]):
+        previous = old_rows.get(path)
+        if previous is None:
+            continue
+        for metric in METRICS:
+            if metric in metrics and metric in previous and previous[metric]:
+                change = (metrics[metric] - previous[metric]) / previous[metric] * 100
+                rows.append((path, metric, previous[metric], metrics[metric], change))
+    return rows
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+
+    with open(argv[0], "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(argv[1], "r", encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{old['meta']['git_revision']} -> {new['meta']['git_revision']}")
+    for path, metric, before, after, change in compare(old, new):
+        print(f"{path:45s} {metric:17s} {before:12.3f} {after:12.3f} {change:+8.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import io
+import os
+import json
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock
+
+from benchmarks.common import FakeEmbeddingFunction, FakeGenerativeModel, FakeHTTPResponse, load_fixture, synthetic_textbook_pages
+
+QUERIES = [
+    "When were the Wright brothers born?",
+    "What were the main causes of the Industrial Revolution?",
+    "How did missionary schools change education in Sri Lanka?",
+    "What was the purpose of the Mahaweli Development programme?",
+    "Did Marie Antoinette really say let them eat cake?",
+    "How did railways affect trade on the plantations?",
+    "Why did trade unions grow stronger in the factory towns?",
+    "What happened to Adolf Hitler in his early years?",
+]
+
+
+class BenchmarkContext:
+    """
+    Lazily builds the shared resources benchmarks need: an embedding function,
+    a chunked synthetic textbook, a Chroma collection and a HistoryQuestionAnswerer.
+
+    Everything lives in a temporary directory, and Gemini and HTTP are replaced
+    with fakes, so no API key or network access is needed.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="future-minds-bench-")
+        self.notes = {}
+        self._embedding_function = None
+        self._pages = None
+        self._chunks_path = None
+        self._client = None
+        self._history_agent = None
+
+    def close(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    @property
+    def uses_real_embeddings(self):
+        return not isinstance(self.embedding_function, FakeEmbeddingFunction)
+
+    @property
+    def embedding_function(self):
+        if self._embedding_function is None:
+            if self.args.fake_embeddings:
+                self._embedding_function = FakeEmbeddingFunction()
+                self.notes["embeddings"] = "fake (requested)"
+            else:
+                try:
+                    from agents.history_agent import SentenceTransformerEmbeddingFunction
+                    self._embedding_function = SentenceTransformerEmbeddingFunction()
+                    self.notes["embeddings"] = "all-mpnet-base-v2"
+                except Exception as e:
+                    # The model is not in the local cache and HF_HUB_OFFLINE blocks downloads
+                    self._embedding_function = FakeEmbeddingFunction()
+                    self.notes["embeddings"] = f"fake (SentenceTransformer unavailable: {e.__class__.__name__})"
+        return self._embedding_function
+
+    @property
+    def raw_pages(self):
+        if self._pages is None:
+            self._pages = synthetic_textbook_pages(self.args.corpus_pages)
+        return self._pages
+
+    def new_processor(self, file_name="bench"):
+        from src.pdf_processing import TextbookProcessor
+        return TextbookProcessor(pdf_path="", file_name=file_name, output_dir=self.workdir)
+
+    def processed_pages(self):
+        """Clean the raw pages and attach section metadata, as extract_text_from_pdf does."""
+        processor = self.new_processor()
+        for i, raw in enumerate(self.raw_pages):
+            text = processor._clean_text(raw)
+            info = processor._extract_section_info(text, i + 1)
+            processor.current_chapter = info.get("chapter", processor.current_chapter)
+            processor.current_section = info.get("section", processor.current_section)
+            processor.current_subsection = info.get("subsection", processor.current_subsection)
+            processor.pages_text.append(text)
+            processor.pages_metadata.append({
+                "page_number": i + 1,
+                "section": processor.current_section,
+                "subsection": processor.current_subsection,
+                "chapter": processor.current_chapter
+            })
+        return processor
+
+    @property
+    def chunks_path(self):
+        if self._chunks_path is None:
+            processor = self.processed_pages()
+            with redirect_stdout(io.StringIO()):
+                processor.chunk_text(self.args.chunk_size, self.args.chunk_overlap, "bench_chunks")
+            self._chunks_path = os.path.join(self.workdir, "bench_chunks.json")
+        return self._chunks_path
+
+    def chunk_texts(self):
+        with open(self.chunks_path, "r", encoding="utf-8") as f:
+            return [chunk["text"] for chunk in json.load(f)["chunks"]]
+
+    @property
+    def chroma_path(self):
+        return os.path.join(self.workdir, "chroma_db")
+
+    @property
+    def parent_db_path(self):
+        return os.path.join(self.workdir, "parents.sqlite3")
+
+    def ingest(self, collection_name="bench"):
+        """Run create_chroma_db on the synthetic chunks and return the collection."""
+        from src.embendding_vectordb import create_chroma_db
+        with redirect_stdout(io.StringIO()):
+            return create_chroma_db(
+                self.chunks_path,
+                collection_name,
+                db_path=self.chroma_path,
+                embedding_function=self.embedding_function,
+                parent_db_path=self.parent_db_path
+            )
+
+    @property
+    def client(self):
+        if self._client is None:
+            import chromadb
+            self.ingest()
+            self._client = chromadb.PersistentClient(path=self.chroma_path)
+        return self._client
+
+    @property
+    def history_agent(self):
+        if self._history_agent is None:
+            from agents import history_agent as history_module
+            client = self.client
+            with mock.patch.dict(os.environ, {"GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", "offline-benchmark")}), \
+                    mock.patch.object(history_module.genai, "GenerativeModel", FakeGenerativeModel):
+                self._history_agent = history_module.HistoryQuestionAnswerer(
+                    client=client,
+                    collection_name="bench",
+                    embedding_function=self.embedding_function
+                )
+        return self._history_agent
+
+    def fake_http_get(self):
+        """Build a Session.get replacement serving the fixture pages."""
+        pages = {
+            "wikipedia": load_fixture("wikipedia_article.html", repeat=self.args.html_repeat),
+            "article": load_fixture("article.html", repeat=self.args.html_repeat),
+        }
+
+        def fake_get(url, *args, **kwargs):
+            key = "wikipedia" if "wikipedia.org" in url else "article"
+            return FakeHTTPResponse(pages[key], url)
+
+        return fake_get, pages
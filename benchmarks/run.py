@@ -0,0 +1,102 @@
+"""
+Offline micro-benchmarks for the hot paths.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run
+    python -m benchmarks.run --only retrieve_context,wikipedia_parse --repeat 20
+    python -m benchmarks.compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+"""
+import os
+import sys
+import time
+import argparse
+import traceback
+
+# Never reach out to the Hugging Face hub; fall back to fake embeddings instead
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+from benchmarks import bench_retrieval, bench_scraping, bench_ingestion, bench_vector_index
+from benchmarks.common import environment_info, save_results
+from benchmarks.context import BenchmarkContext
+
+MODULES = [bench_ingestion, bench_retrieval, bench_vector_index, bench_scraping]
+
+
+def all_benchmarks():
+    benchmarks = {}
+    for module in MODULES:
+        benchmarks.update(module.BENCHMARKS)
+    return benchmarks
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--only", default="", help="Comma-separated benchmark names to run")
+    parser.add_argument("--list", action="store_true", help="List benchmark names and exit")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per measurement")
+    parser.add_argument("--corpus-pages", type=int, default=200, help="Pages in the synthetic textbook")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=250)
+    parser.add_argument("--html-repeat", type=int, default=20,
+                        help="Times the repeatable block of each HTML fixture is included")
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="Use hashed fake embeddings even if the SentenceTransformer model is cached")
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/<time>_<rev>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    benchmarks = all_benchmarks()
+
+    if args.list:
+        for name, fn in benchmarks.items():
+            print(f"{name:24s} {(fn.__doc__ or '').strip().splitlines()[0]}")
+        return 0
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()] or list(benchmarks)
+    unknown = [name for name in selected if name not in benchmarks]
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    ctx = BenchmarkContext(args)
+    results = {
+        "meta": environment_info(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("only", "list", "output")},
+        "benchmarks": {}
+    }
+    try:
+        for name in selected:
+            print(f"Running {name}...", flush=True)
+            start = time.perf_counter()
+            try:
+                results["benchmarks"][name] = benchmarks[name](ctx)
+            except Exception as e:
+                traceback.print_exc()
+                results["benchmarks"][name] = {"error": f"{e.__class__.__name__}: {e}"}
+            print(f"  done in {time.perf_counter() - start:.1f}s", flush=True)
+    finally:
+        results["meta"]["notes"] = ctx.notes
+        ctx.close()
+
+    path = save_results(results, args.output)
+    print(f"Results saved to {path}")
+
+    # Benchmarks that also check correctness (e.g. backend parity) list what went wrong under "failures"
+    failures = [
+        f"{name}: {failure}"
+        for name, result in results["benchmarks"].items()
+        if isinstance(result, dict)
+        for failure in result.get("failures", [])
+    ]
+    for failure in failures:
+        print(f"FAILED {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
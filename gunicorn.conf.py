@@ -0,0 +1,84 @@
+# gunicorn.conf.py
+# Production entry point: gunicorn -c gunicorn.conf.py app:app
+#
+# The app (SentenceTransformer weights, Chroma collection metadata, agents) is
+# loaded once in the master and workers are forked from it, so read-only state
+# is shared copy-on-write instead of being loaded again by every worker.
+
+import gc
+import os
+import shutil
+import time
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# Threads keep streaming responses and slow scrapes from blocking a whole worker
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+# History answers scrape several pages and call Gemini, which can take a while
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = True
+
+# Prometheus needs a shared directory to aggregate metrics across workers; it must
+# be set before prometheus_client is imported by the app
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "processed_data/prometheus")
+)
+shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+# How often each worker refreshes its memory gauges (seconds)
+MEMORY_REPORT_INTERVAL = float(os.getenv("MEMORY_REPORT_INTERVAL", "30"))
+_last_memory_report = 0.0
+
+
+def when_ready(server):
+    # Move everything the master allocated into the permanent generation so the
+    # workers' garbage collector never writes to those pages (which would copy them)
+    gc.collect()
+    gc.freeze()
+
+    from agents.process_memory import read_memory_usage
+    usage = read_memory_usage()
+    if usage:
+        server.log.info("Master loaded app: rss=%.1f MB", usage["rss"] / 2**20)
+
+
+def post_fork(server, worker):
+    import app
+
+    # Split the CPU between workers instead of every worker using all cores
+    torch_threads = int(os.getenv("TORCH_THREADS", "0")) or max(1, (os.cpu_count() or 1) // workers)
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+    app.reinitialize_after_fork()
+
+
+def post_worker_init(worker):
+    from agents.metrics import record_worker_memory
+    usage = record_worker_memory()
+    if usage:
+        worker.log.info(
+            "Worker %s memory: rss=%.1f MB shared=%.1f MB private=%.1f MB pss=%.1f MB",
+            worker.pid, usage["rss"] / 2**20, usage["shared"] / 2**20,
+            usage["private"] / 2**20, usage["pss"] / 2**20
+        )
+
+
+def post_request(worker, req, environ, resp):
+    global _last_memory_report
+    now = time.monotonic()
+    if now - _last_memory_report >= MEMORY_REPORT_INTERVAL:
+        _last_memory_report = now
+        from agents.metrics import record_worker_memory
+        record_worker_memory()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,170 @@
+# build_quantized_index.py
+# Build, inspect and evaluate the IVF + int8 index used for large multi-textbook corpora
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import chromadb
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.quantized_index import QuantizedVectorIndex, build_quantized_index, normalize_rows
+from agents.process_memory import read_memory_usage
+
+CHROMA_DB_PATH = "processed_data/chroma_db"
+INDEX_ROOT = "processed_data/vector_index"
+
+
+def default_index_path(collection_name):
+    return os.path.join(INDEX_ROOT, collection_name)
+
+
+def exact_top_k(vectors, queries, k, block_size=100_000):
+    """Exact top-k row positions per query, scanning the (memory-mapped) vectors in blocks."""
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(vectors), block_size):
+        scores = queries @ np.asarray(vectors[start:start + block_size]).T
+        rows = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+        scores = np.concatenate([best_scores, scores], axis=1)
+        rows = np.concatenate([best_rows, rows], axis=1)
+        keep = np.argsort(-scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_rows = np.take_along_axis(rows, keep, axis=1)
+    return best_rows
+
+
+def _percentile(values, percentile):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))]
+
+
+def _load_query_vectors(args, index):
+    if args.questions:
+        from src.retrieval_eval import load_questions
+        from agents.history_agent import SentenceTransformerEmbeddingFunction
+
+        questions = [item["question"] for item in load_questions(args.questions)]
+        return normalize_rows(SentenceTransformerEmbeddingFunction()(questions)), "questions"
+
+    # Without labeled questions, query with stored chunk vectors (each finds itself,
+    # so recall is slightly optimistic)
+    rng = np.random.default_rng(args.seed)
+    rows = np.sort(rng.choice(index.count(), min(args.sample_queries, index.count()), replace=False))
+    return np.asarray(index.vectors[rows]), "sampled chunks"
+
+
+def report(index, query_vectors, k, nprobe_values, rerank):
+    """Recall@k against exact search, latency and memory for several nprobe values."""
+    start = time.perf_counter()
+    exact = exact_top_k(index.vectors, query_vectors, k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(query_vectors)
+
+    rows = []
+    for nprobe in nprobe_values:
+        latencies, recalls = [], []
+        for query, truth in zip(query_vectors, exact):
+            start = time.perf_counter()
+            found, _ = index.search(query, k, nprobe=nprobe, rerank=rerank)
+            latencies.append(time.perf_counter() - start)
+            recalls.append(len(set(found.tolist()) & set(truth.tolist())) / len(truth))
+        rows.append({
+            "nprobe": nprobe,
+            "rerank": max(rerank, k),
+            "recall_at_k": sum(recalls) / len(recalls),
+            "p50_ms": _percentile(latencies, 50) * 1000,
+            "p99_ms": _percentile(latencies, 99) * 1000
+        })
+
+    count, dim = index.count(), index.metadata["dim"]
+    memory = {
+        "float32_matrix_bytes": count * dim * 4,
+        "int8_codes_bytes": int(index.codes.nbytes),
+        "process_heap_bytes": index.memory_usage(),
+        "files": index.disk_usage(),
+        "process": read_memory_usage()
+    }
+    return {"k": k, "exact_scan_ms": exact_ms, "results": rows, "memory": memory}
+
+
+def print_report(result):
+    print(f"\nExact brute-force scan: {result['exact_scan_ms']:.2f} ms/query")
+    print(f"{'nprobe':>7} {'rerank':>7} {'recall@' + str(result['k']):>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in result["results"]:
+        print(f"{row['nprobe']:>7} {row['rerank']:>7} {row['recall_at_k']:>10.3f} "
+              f"{row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+
+    memory = result["memory"]
+    print(f"\nfloat32 matrix: {memory['float32_matrix_bytes'] / 2**20:.1f} MB, "
+          f"int8 codes: {memory['int8_codes_bytes'] / 2**20:.1f} MB (memory-mapped), "
+          f"process heap: {memory['process_heap_bytes'] / 2**20:.2f} MB")
+    if memory["process"]:
+        print(f"Process rss={memory['process']['rss'] / 2**20:.1f} MB "
+              f"shared={memory['process']['shared'] / 2**20:.1f} MB "
+              f"private={memory['process']['private'] / 2**20:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, inspect and evaluate a quantized vector index.")
+    parser.add_argument("--db-path", default=CHROMA_DB_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Build an index from a Chroma collection")
+    build.add_argument("collection", help="Collection to index")
+    build.add_argument("--output", default="", help="Index directory (default: processed_data/vector_index/<collection>)")
+    build.add_argument("--nlist", type=int, default=0, help="Inverted lists (default: 4 * sqrt(count))")
+    build.add_argument("--train-size", type=int, default=100_000)
+    build.add_argument("--iterations", type=int, default=10)
+    build.add_argument("--seed", type=int, default=0)
+
+    info = subparsers.add_parser("info", help="Load an index and print its metadata and sizes")
+    info.add_argument("index", help="Index directory")
+
+    evaluate = subparsers.add_parser("report", help="Recall, latency and memory against exact search")
+    evaluate.add_argument("index", help="Index directory")
+    evaluate.add_argument("--questions", default="", help="CSV with a Question column to embed as queries")
+    evaluate.add_argument("--sample-queries", type=int, default=200, help="Stored chunks used as queries without --questions")
+    evaluate.add_argument("--k", type=int, default=10)
+    evaluate.add_argument("--nprobe", default="1,4,8,16,32,64", help="Comma-separated nprobe values")
+    evaluate.add_argument("--rerank", type=int, default=100)
+    evaluate.add_argument("--seed", type=int, default=0)
+    evaluate.add_argument("--output", default="processed_data/quantized_index_report.json")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        client = chromadb.PersistentClient(path=args.db_path)
+        collection = client.get_collection(name=args.collection)
+        output = args.output or default_index_path(args.collection)
+        print(f"Building index for '{args.collection}' ({collection.count()} chunks) in {output}")
+        metadata = build_quantized_index(collection, output, nlist=args.nlist or None, train_size=args.train_size,
+                                         iterations=args.iterations, seed=args.seed)
+        print(json.dumps(metadata, indent=2))
+
+    elif args.command == "info":
+        index = QuantizedVectorIndex(args.index)
+        print(json.dumps({**index.metadata, "files": index.disk_usage(),
+                          "process_heap_bytes": index.memory_usage()}, indent=2))
+
+    else:
+        index = QuantizedVectorIndex(args.index)
+        query_vectors, source = _load_query_vectors(args, index)
+        print(f"Evaluating {index.count()} vectors, nlist={index.metadata['nlist']}, "
+              f"{len(query_vectors)} queries from {source}")
+        nprobe_values = [int(n) for n in args.nprobe.split(",") if n.strip()]
+        result = report(index, query_vectors, args.k, nprobe_values, args.rerank)
+        result["queries"] = source
+        print_report(result)
+
+        output_dir = os.path.dirname(args.output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
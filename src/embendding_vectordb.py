@@ -1,7 +1,13 @@
+import os
+import sys
 import json
 import chromadb
 from sentence_transformers import SentenceTransformer
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.retrieval_filters import scope_metadata
+from agents.parent_store import ParentStore
+
 
 class SentenceTransformerEmbeddingFunction:
     def __init__(self, model_name="all-mpnet-base-v2", device="cpu"):
@@ -14,12 +20,15 @@ class SentenceTransformerEmbeddingFunction:
         return embeddings.tolist()
 
 
-def create_chroma_db(json_file_path, collection_name):
+def create_chroma_db(json_file_path, collection_name, db_path="processed_data/chroma_db", embedding_function=None,
+                     parent_db_path="processed_data/parents.sqlite3"):
     # Load JSON file
     try:
         with open(json_file_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
             chunks_data = data.get("chunks", [])
+            # Parent windows for small-to-big retrieval (see TextbookProcessor.chunk_text)
+            parents_data = data.get("parents", [])
     except FileNotFoundError:
         print(f"Error: File not found at {json_file_path}")
         return None
@@ -28,7 +37,7 @@ def create_chroma_db(json_file_path, collection_name):
         return None
 
     # Initialize ChromaDB client with persistent path
-    client = chromadb.PersistentClient(path="processed_data/chroma_db")
+    client = chromadb.PersistentClient(path=db_path)
 
     # Delete existing collection if it exists
     try:
@@ -38,7 +47,8 @@ def create_chroma_db(json_file_path, collection_name):
         pass  # no collection to delete
 
     # Create collection with embedding function
-    embedding_function = SentenceTransformerEmbeddingFunction()
+    if embedding_function is None:
+        embedding_function = SentenceTransformerEmbeddingFunction()
     collection = client.create_collection(
         name=collection_name,
         embedding_function=embedding_function
@@ -47,6 +57,7 @@ def create_chroma_db(json_file_path, collection_name):
     documents = []
     metadatas = []
     ids = []
+    chunk_parents = {}
 
     for i, chunk in enumerate(chunks_data):
         if isinstance(chunk, dict):
@@ -64,6 +75,11 @@ def create_chroma_db(json_file_path, collection_name):
                 "chunk_id": chunk.get("chunk_id"),
                 "chunk_index": chunk.get("chunk_index")
             }
+            # Parsed chapter/section numbers for scoped retrieval filters
+            metadata.update(scope_metadata(chunk.get("chapter"), chunk.get("section"), chunk.get("subsection")))
+            if chunk.get("parent_id"):
+                metadata["parent_id"] = chunk["parent_id"]
+                chunk_parents[f"doc_{i}"] = chunk["parent_id"]
 
             documents.append(text)
             metadatas.append(metadata)
@@ -85,6 +101,11 @@ def create_chroma_db(json_file_path, collection_name):
         )
         print(f"Added batch {i // batch_size + 1} / {(len(documents) + batch_size - 1) // batch_size}")
 
+    # Chunk -> parent lookup table; re-ingesting without parents clears the old ones
+    ParentStore(parent_db_path).replace_collection(collection_name, parents_data, chunk_parents)
+    if parents_data:
+        print(f"Stored {len(parents_data)} parent windows for {len(chunk_parents)} chunks")
+
     print(f"Successfully created ChromaDB collection '{collection_name}' with {len(documents)} chunks")
     return collection
 
@@ -34,6 +34,9 @@ class TextbookProcessor:
         self.chunks = []
         self.chunks_metadata = []
         
+        # Parent windows for small-to-big retrieval (filled when chunk_text is given a parent_level)
+        self.parents = []
+
         # Keep track of current chapter/section across pages
         self.current_chapter = ""
         self.current_section = ""
@@ -158,15 +161,24 @@ class TextbookProcessor:
     def chunk_text(self,
                    chunk_size: int,
                    chunk_overlap: int,
-                   file_name: str) -> None:
+                   file_name: str,
+                   parent_level: Optional[str] = None) -> None:
         """
         Split extracted text into overlapping chunks with headings and page numbers included.
 
+        With a parent_level, the chunks are meant to be small "children" for precise
+        matching, and each is linked to a parent window ("page", or "section" for a
+        run of pages with the same chapter and section) that is stored once in the
+        output and put into the prompt instead of the child.
+
         Args:
             chunk_size: Target size of each chunk in characters
             chunk_overlap: Overlap between chunks in characters
             file_name: Base filename for saving output
+            parent_level: None, "page" or "section"
         """
+        if parent_level not in (None, "page", "section"):
+            raise ValueError(f"Unknown parent level: {parent_level}")
         print(f"Chunking text with size={chunk_size}, overlap={chunk_overlap}...")
 
         # Initialize text splitter
@@ -193,20 +205,27 @@ class TextbookProcessor:
             # Prepend heading and page number to page text for context
             page_text_with_heading = f"{heading_prefix} (Page {metadata['page_number']})\n\n{text}"
 
+            parent_id = None
+            if parent_level:
+                parent_id = self._add_to_parent(parent_level, page_text_with_heading, metadata)
+
             # Split page text into chunks
             page_chunks = text_splitter.create_documents([page_text_with_heading])
 
             for j, chunk in enumerate(page_chunks):
                 chunk_text = chunk.page_content
                 self.chunks.append(chunk_text)
-                self.chunks_metadata.append({
+                chunk_metadata = {
                     "chunk_id": f"p{metadata['page_number']}_c{j}",
                     "page_number": metadata["page_number"],
                     "section": metadata.get("section", ""),
                     "subsection": metadata.get("subsection", ""),
                     "chapter": metadata.get("chapter", ""),
                     "chunk_index": j,
-                })
+                }
+                if parent_id:
+                    chunk_metadata["parent_id"] = parent_id
+                self.chunks_metadata.append(chunk_metadata)
 
         print(f"Created {len(self.chunks)} chunks from {len(self.pages_text)} pages.")
 
@@ -222,11 +241,17 @@ class TextbookProcessor:
                 "chunk_id": meta.get("chunk_id"),
                 "chunk_index": meta.get("chunk_index")
             }
+            if meta.get("parent_id"):
+                combined["parent_id"] = meta["parent_id"]
             combined_chunks.append(combined)
 
-        # Save combined chunks to JSON
+        # Save combined chunks (and parent windows, if any) to JSON
+        output = {"chunks": combined_chunks}
+        if parent_level:
+            output["parents"] = self.parents
+            print(f"Linked chunks to {len(self.parents)} {parent_level} parent windows.")
         with open(os.path.join(self.output_dir, f"{file_name}.json"), "w", encoding="utf-8") as f:
-            json.dump({"chunks": combined_chunks}, f, indent=2)
+            json.dump(output, f, indent=2)
 
         # Save metadata and chunk text separately as CSV
         with open(os.path.join(self.output_dir, f"{file_name}.csv"), mode="w", newline="", encoding="utf-8") as csv_file:
@@ -246,6 +271,32 @@ class TextbookProcessor:
 
         print(f"Chunks and metadata saved to {self.output_dir} folder.")
 
+    def _add_to_parent(self, parent_level: str, page_text: str, metadata: Dict[str, Any]) -> str:
+        """Append a page to its parent window, starting a new one when needed, and return the parent ID."""
+        page_number = metadata["page_number"]
+        previous = self.parents[-1] if self.parents else None
+        same_section = (
+            previous is not None
+            and previous["chapter"] == metadata.get("chapter", "")
+            and previous["section"] == metadata.get("section", "")
+        )
+        if parent_level == "section" and same_section:
+            previous["text"] += "\n\n" + page_text
+            previous["page_end"] = page_number
+            return previous["parent_id"]
+
+        parent_id = f"p{page_number}" if parent_level == "page" else f"s{len(self.parents)}"
+        self.parents.append({
+            "parent_id": parent_id,
+            "text": page_text,
+            "page_number": page_number,
+            "page_end": page_number,
+            "chapter": metadata.get("chapter", ""),
+            "section": metadata.get("section", ""),
+            "subsection": metadata.get("subsection", "")
+        })
+        return parent_id
+
     def analyze_structure(self) -> Dict[str, Any]:
         """Analyze the structure of the PDF to better understand its format."""
         chapter_count = 0
@@ -274,7 +325,8 @@ class TextbookProcessor:
             "sections": list(sections)[:5],  # Show first 5 sections as samples
         }
 
-    def process(self, chunk_size: int, chunk_overlap: int, file_name: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+    def process(self, chunk_size: int, chunk_overlap: int, file_name: str,
+                parent_level: Optional[str] = None) -> Tuple[List[str], List[Dict[str, Any]]]:
         """
         Process the PDF: extract text, clean it, and split into chunks.
 
@@ -282,6 +334,7 @@ class TextbookProcessor:
             chunk_size: Target size of each chunk in characters
             chunk_overlap: Overlap between chunks in characters
             file_name: Base filename for saving output
+            parent_level: None, "page" or "section" parent windows (see chunk_text)
 
         Returns:
             Tuple of (chunks, chunks_metadata)
@@ -308,16 +361,16 @@ class TextbookProcessor:
                 return self.chunks, self.chunks_metadata
         
         # Continue with chunking
-        self.chunk_text(chunk_size, chunk_overlap, file_name)
+        self.chunk_text(chunk_size, chunk_overlap, file_name, parent_level)
         return self.chunks, self.chunks_metadata
 
 
-def get_user_inputs() -> Tuple[str, int, int, str]:
+def get_user_inputs() -> Tuple[str, int, int, str, Optional[str]]:
     """
-    Collect user inputs for PDF path, chunk size, chunk overlap, and file name.
+    Collect user inputs for PDF path, chunk size, chunk overlap, file name and parent windows.
 
     Returns:
-        Tuple containing pdf_path, chunk_size, chunk_overlap, and file_name.
+        Tuple containing pdf_path, chunk_size, chunk_overlap, file_name and parent_level.
     """
     pdf_path = input("\nPath to pdf: ").strip()
     if not os.path.isfile(pdf_path):
@@ -335,14 +388,18 @@ def get_user_inputs() -> Tuple[str, int, int, str]:
 
     file_name = input("\nIn which name we should save Chunks? ").strip()
 
-    return pdf_path, chunk_size, chunk_overlap, file_name
+    # Small-to-big: small chunks (e.g. 300/50) matched precisely, parent windows sent to the model
+    parent_level_input = input("\nParent windows for small-to-big retrieval (page/section/none, Default-> none): ").strip().lower()
+    parent_level = parent_level_input if parent_level_input in ("page", "section") else None
+
+    return pdf_path, chunk_size, chunk_overlap, file_name, parent_level
 
 
 def main():
-    pdf_path, chunk_size, chunk_overlap, file_name = get_user_inputs()
+    pdf_path, chunk_size, chunk_overlap, file_name, parent_level = get_user_inputs()
 
     processor = TextbookProcessor(pdf_path, file_name)
-    chunks, metadata = processor.process(chunk_size, chunk_overlap, file_name)
+    chunks, metadata = processor.process(chunk_size, chunk_overlap, file_name, parent_level)
 
     print(f"\nProcessing complete. Generated {len(chunks)} chunks.")
 
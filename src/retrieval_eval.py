@@ -0,0 +1,267 @@
+# retrieval_eval.py
+# Retrieval quality vs. latency evaluation for retrieve_context
+
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import statistics
+import tempfile
+from typing import List, Dict, Any, Optional, Tuple
+
+import chromadb
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.history_agent import HistoryQuestionAnswerer, SentenceTransformerEmbeddingFunction
+from agents.parent_store import ParentStore
+
+load_dotenv()
+
+CHROMA_DB_PATH = "processed_data/chroma_db"
+PARENT_DB_PATH = "processed_data/parents.sqlite3"
+
+# Rough characters-per-token ratio for English text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def _parse_pages(value: str) -> List[int]:
+    pages = []
+    for part in str(value or "").replace(";", ",").split(","):
+        part = part.strip()
+        if part.isdigit():
+            pages.append(int(part))
+        elif "-" in part:
+            start, _, end = part.partition("-")
+            if start.strip().isdigit() and end.strip().isdigit():
+                pages.extend(range(int(start), int(end) + 1))
+    return pages
+
+
+def _parse_sections(value: str) -> List[str]:
+    value = str(value or "").strip()
+    if not value or value.upper() == "N/A":
+        return []
+    separator = ";" if ";" in value else ","
+    return [part.strip() for part in value.split(separator) if part.strip()]
+
+
+def load_questions(csv_path: str) -> List[Dict[str, Any]]:
+    """
+    Load a labeled question set.
+
+    The CSV needs a "Question" column plus "Expected Pages" and/or "Expected Sections"
+    (the "Pages" and "Sections" columns written by batch_answer_genarator are also
+    accepted). Pages are comma separated and may contain ranges ("12-14"); sections
+    are separated by ";" (or "," when no ";" is present).
+    """
+    questions = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        question_col = columns.get("question")
+        pages_col = columns.get("expected pages") or columns.get("expected_pages") or columns.get("pages")
+        sections_col = columns.get("expected sections") or columns.get("expected_sections") or columns.get("sections")
+        if not question_col or not (pages_col or sections_col):
+            raise ValueError("CSV must have a Question column and Expected Pages and/or Expected Sections columns")
+
+        for row in reader:
+            question = (row.get(question_col) or "").strip()
+            if not question:
+                continue
+            expected_pages = _parse_pages(row.get(pages_col)) if pages_col else []
+            expected_sections = _parse_sections(row.get(sections_col)) if sections_col else []
+            if expected_pages or expected_sections:
+                questions.append({
+                    "question": question,
+                    "pages": expected_pages,
+                    "sections": expected_sections
+                })
+    return questions
+
+
+def _section_matches(expected: str, retrieved: str) -> bool:
+    # "1.2" matches "1.2 Steam Power"; full titles match case-insensitively
+    expected = expected.lower()
+    retrieved = retrieved.lower()
+    return retrieved == expected or retrieved.startswith(expected + " ")
+
+
+def _score(expected: list, retrieved: list, matches) -> Tuple[Optional[float], Optional[float]]:
+    """Returns (recall, reciprocal rank of the first relevant item), or (None, None) without labels."""
+    if not expected:
+        return None, None
+    found = [e for e in expected if any(matches(e, r) for r in retrieved)]
+    reciprocal_rank = 0.0
+    for rank, item in enumerate(retrieved, start=1):
+        if any(matches(e, item) for e in expected):
+            reciprocal_rank = 1.0 / rank
+            break
+    return len(found) / len(expected), reciprocal_rank
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percentile / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _mean(values: List[Optional[float]]) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return statistics.fmean(values) if values else None
+
+
+def evaluate(answerer: HistoryQuestionAnswerer, questions: List[Dict[str, Any]], n_results: int) -> Dict[str, Any]:
+    """
+    Run retrieve_context for every question and aggregate quality, size and latency.
+
+    Recall and MRR are computed over the distinct pages (and sections) in the order
+    retrieve_context returns them.
+    """
+    latencies = []
+    page_recalls, page_rrs, section_recalls, section_rrs = [], [], [], []
+    context_chars = []
+
+    for item in questions:
+        start = time.perf_counter()
+        result = answerer.retrieve_context(item["question"], n_results=n_results)
+        latencies.append(time.perf_counter() - start)
+
+        recall, rr = _score(item["pages"], result["pages"], lambda e, r: int(e) == int(r))
+        page_recalls.append(recall)
+        page_rrs.append(rr)
+        recall, rr = _score(item["sections"], result["sections"], _section_matches)
+        section_recalls.append(recall)
+        section_rrs.append(rr)
+        context_chars.append(len(result["context"]))
+
+    mean_chars = statistics.fmean(context_chars)
+    return {
+        "n_results": n_results,
+        "questions": len(questions),
+        "page_recall": _mean(page_recalls),
+        "page_mrr": _mean(page_rrs),
+        "section_recall": _mean(section_recalls),
+        "section_mrr": _mean(section_rrs),
+        "context_chars": mean_chars,
+        "context_tokens": mean_chars / CHARS_PER_TOKEN,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000
+    }
+
+
+def build_collection(raw_pages_path: str, chunk_size: int, chunk_overlap: int, workdir: str,
+                     embedding_function, parent_level: Optional[str] = None) -> Tuple[chromadb.ClientAPI, str]:
+    """
+    Re-chunk the extracted pages with a given configuration into a temporary collection.
+
+    With a parent_level ("page" or "section"), the chunks are small-to-big children and
+    their parent windows are stored in <workdir>/parents.sqlite3.
+    """
+    from src.pdf_processing import TextbookProcessor
+    from src.embendding_vectordb import create_chroma_db
+
+    with open(raw_pages_path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+
+    name = f"eval_{chunk_size}_{chunk_overlap}" + (f"_{parent_level}" if parent_level else "")
+    processor = TextbookProcessor(pdf_path="", file_name=name, output_dir=workdir)
+    processor.pages_text = raw["pages_text"]
+    processor.pages_metadata = raw["pages_metadata"]
+    processor.chunk_text(chunk_size, chunk_overlap, name, parent_level)
+
+    db_path = os.path.join(workdir, "chroma_db")
+    create_chroma_db(os.path.join(workdir, f"{name}.json"), name, db_path=db_path, embedding_function=embedding_function,
+                     parent_db_path=os.path.join(workdir, "parents.sqlite3"))
+    return chromadb.PersistentClient(path=db_path), name
+
+
+def _parse_chunk_configs(value: str) -> List[Tuple[int, int, Optional[str]]]:
+    configs = []
+    for part in value.split(","):
+        if part.strip():
+            size, _, rest = part.partition(":")
+            overlap, _, parent_level = rest.partition(":")
+            configs.append((int(size), int(overlap or 0), parent_level or None))
+    return configs
+
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+
+    print(f"\n{'chunks':>14} {'k':>4} {'page R@k':>9} {'page MRR':>9} {'sect R@k':>9} {'sect MRR':>9} "
+          f"{'ctx tok':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in rows:
+        print(f"{row['chunk_config']:>14} {row['n_results']:>4} {fmt(row['page_recall'], '.3f'):>9} "
+              f"{fmt(row['page_mrr'], '.3f'):>9} {fmt(row['section_recall'], '.3f'):>9} "
+              f"{fmt(row['section_mrr'], '.3f'):>9} {row['context_tokens']:>8.0f} "
+              f"{row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality against latency and context size.")
+    parser.add_argument("--questions", required=True, help="Labeled CSV (Question, Expected Pages, Expected Sections)")
+    parser.add_argument("--collection", default="textbook", help="Existing collection to evaluate")
+    parser.add_argument("--n-results", default="3,5,10,20", help="Comma-separated n_results values")
+    parser.add_argument("--chunk-configs", default="",
+                        help="Comma-separated size:overlap[:page|section] configs to re-chunk and evaluate, "
+                             "e.g. 500:100,1000:250,300:50:page (the third field adds small-to-big parent windows)")
+    parser.add_argument("--raw-pages", default="", help="raw_pages(<name>).json written by pdf_processing (for --chunk-configs)")
+    parser.add_argument("--context-tokens", type=int, default=0, help="Context token budget (0 for no limit)")
+    parser.add_argument("--parent-db", default=PARENT_DB_PATH, help="Parent windows of the existing collection")
+    parser.add_argument("--output", default="processed_data/retrieval_eval.json")
+    args = parser.parse_args()
+
+    # Retrieval never calls Gemini, but the answerer refuses to start without a key
+    os.environ.setdefault("GOOGLE_API_KEY", "retrieval-eval")
+
+    questions = load_questions(args.questions)
+    if not questions:
+        print("No labeled questions found.")
+        return
+    n_results_values = [int(n) for n in args.n_results.split(",") if n.strip()]
+    embedding_function = SentenceTransformerEmbeddingFunction()
+
+    targets = []
+    if args.chunk_configs:
+        if not args.raw_pages:
+            parser.error("--chunk-configs requires --raw-pages")
+        workdir = tempfile.mkdtemp(prefix="retrieval-eval-")
+        parent_store = ParentStore(os.path.join(workdir, "parents.sqlite3"))
+        for chunk_size, chunk_overlap, parent_level in _parse_chunk_configs(args.chunk_configs):
+            client, name = build_collection(args.raw_pages, chunk_size, chunk_overlap, workdir, embedding_function,
+                                            parent_level)
+            label = f"{chunk_size}:{chunk_overlap}" + (f":{parent_level}" if parent_level else "")
+            targets.append((label, client, name))
+    else:
+        parent_store = ParentStore(args.parent_db)
+        targets.append(("existing", chromadb.PersistentClient(path=CHROMA_DB_PATH), args.collection))
+
+    rows = []
+    for label, client, collection_name in targets:
+        answerer = HistoryQuestionAnswerer(client=client, collection_name=collection_name,
+                                           embedding_function=embedding_function, parent_store=parent_store,
+                                           context_token_budget=args.context_tokens or None)
+        # Warm up the embedding model so the first configuration is not penalized
+        answerer.retrieve_context(questions[0]["question"], n_results=1)
+        for n_results in n_results_values:
+            row = evaluate(answerer, questions, n_results)
+            row["chunk_config"] = label
+            row["collection_size"] = answerer.collection.count()
+            rows.append(row)
+
+    print_table(rows)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"questions": len(questions), "results": rows}, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()